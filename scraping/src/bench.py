@@ -0,0 +1,453 @@
+"""
+Micro-benchmarks for the hot paths of the pipeline.
+
+    python bench.py fetch ../validation.csv pages/ --limit 50
+    python bench.py extract pages/
+    python bench.py rank pages/
+    python bench.py batching pages/ --clients 8
+    python bench.py fetch ../validation.csv val_pages/ --limit 200
+    python bench.py backends val_pages/ --backends torch torch-int8 onnx onnx-int8
+    python bench.py fetch ../validation.csv team_pages/ --paths team our-team leadership people
+    python bench.py profiles team_pages/ --nest 30
+    python bench.py titles ../bios.csv
+"""
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+from extract import extract_page_bs4, extract_page_lxml
+
+
+def _timed(fn, items, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = [fn(item) for item in items]
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def fetch_pages(args):
+    """Save firm homepages as .html files to build an extraction corpus."""
+    import pandas as pd
+    import requests
+    from crawler import HEADERS
+
+    os.makedirs(args.out, exist_ok=True)
+    df = pd.read_csv(args.csv)
+    saved = 0
+    for site in df['website'].dropna().head(args.limit):
+        for path in args.paths:
+            url = site if site.startswith("http") else "https://" + site
+            url = url.rstrip("/") + "/" + path if path else url
+            try:
+                res = requests.get(url, headers=HEADERS, timeout=10)
+                res.raise_for_status()
+            except requests.RequestException as e:
+                print(f"[fetch] {url}: {type(e).__name__}")
+                continue
+            name = "_".join(filter(None, [site.replace("/", "_"), path]))
+            with open(os.path.join(args.out, name + ".html"), "w", encoding="utf-8") as f:
+                f.write(res.text)
+            saved += 1
+    print(f"[fetch] saved {saved} pages to {args.out}")
+
+
+# (markup, whether the extractors are expected to agree): the block-in-<p>
+# structures are the known differences documented on extract_page_lxml.
+PARITY_CASES = [
+    ("<h2>Focus</h2><p>We invest in <b>software</b>.</p>", True),
+    ("<p>Intro<span>inline</span>after</p>", True),
+    ("<p>One<br>two</p><p>three", True),
+    ("<div><p>Text</p><script>var x = '<p>no</p>';</script></div>", True),
+    ("<p>Intro<div>block</div>after</p>", False),
+    ("<p>Intro<ul><li>item</li></ul>after</p>", False),
+    ("<p>Intro<table><tr><td>cell</td></tr></table>after</p>", False),
+    ("<p>Intro<h2>Head</h2>after</p>", False),
+    ("<p>outer<p>inner</p>tail</p>", False),
+]
+
+
+def check_parity_cases():
+    """Print how the extractors compare on PARITY_CASES; returns the unexpected ones."""
+    unexpected = 0
+    for html, expect_same in PARITY_CASES:
+        ref, new = extract_page_bs4(html), extract_page_lxml(html)
+        same = ref.blocks == new.blocks and ref.chunks == new.chunks
+        if same != expect_same:
+            unexpected += 1
+        label = "same" if same else "differs"
+        note = "" if same == expect_same else "  UNEXPECTED"
+        print(f"  {label:7s} {html}{note}")
+        if not same:
+            print(f"          bs4 {ref.blocks}\n          lxml {new.blocks}")
+    return unexpected
+
+
+def bench_extract(args):
+    """BeautifulSoup tree + find_all walks vs. the single-pass lxml extractor."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.dir, "*.html"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    if not pages:
+        raise SystemExit(f"no .html files in {args.dir}")
+    mb = sum(len(p) for p in pages) / 1e6
+
+    t_bs4, ref = _timed(extract_page_bs4, pages, args.repeat)
+    t_lxml, new = _timed(extract_page_lxml, pages, args.repeat)
+
+    same = sum(a.chunks == b.chunks for a, b in zip(ref, new))
+    links = sum(a.links == b.links for a, b in zip(ref, new))
+    print(f"{len(pages)} pages, {mb:.1f} MB")
+    print(f"bs4:  {t_bs4:.3f}s  {len(pages) / t_bs4:8.1f} pages/s  {mb / t_bs4:6.2f} MB/s")
+    print(f"lxml: {t_lxml:.3f}s  {len(pages) / t_lxml:8.1f} pages/s  {mb / t_lxml:6.2f} MB/s"
+          f"  ({t_bs4 / t_lxml:.1f}x)")
+    print(f"identical chunks on {same}/{len(pages)} pages, identical links on {links}/{len(pages)}")
+    print("parity cases:")
+    if check_parity_cases():
+        raise SystemExit("extractors disagree on a parity case expected to match, or vice versa")
+
+
+def _site_chunks(directory):
+    """Chunks of every saved page, one list per file (a stand-in for one firm)."""
+    firms = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            firms.append(extract_page_lxml(f.read()).chunks)
+    return [chunks for chunks in firms if chunks]
+
+
+def bench_rank(args):
+    """
+    Per-firm cost of embed_and_rank_paragraphs' scoring, old loops vs.
+    vectorised. The loops apply KeywordMatcher's keyword rule one keyword at
+    a time; both paths must pick the same top-k chunks for every firm before
+    timings are printed. Also reports how many chunks the old
+    `kw in p.lower()` rule flags differently (it never matched "AI", "SaaS").
+    """
+    import re
+    from scrape import KEYWORDS, KEYWORD_PATTERN, _is_noise, contains_flags, drop_noise, top_indices
+
+    firms = _site_chunks(args.dir)
+    if not firms:
+        raise SystemExit(f"no pages with text in {args.dir}")
+    rng = np.random.default_rng(0)
+    vectors = []
+    for chunks in firms:
+        # one vector per distinct text, as a real embedding model gives
+        unique = {c: None for c in chunks}
+        v = rng.standard_normal((len(unique), args.dim)).astype(np.float32)
+        row = dict(zip(unique, v / np.linalg.norm(v, axis=1, keepdims=True)))
+        vectors.append(np.array([row[c] for c in chunks]))
+    query = rng.standard_normal(args.dim).astype(np.float32)
+
+    def has_keyword(p):
+        lowered = p.lower()
+        return any(kw in lowered if kw == kw.lower() else re.search(rf"\b{re.escape(kw)}\b", p)
+                   for kw in KEYWORDS)
+
+    def reference(i):
+        chunks, embs = firms[i], vectors[i]
+        keep = [j for j, p in enumerate(chunks) if not _is_noise(p, 5, 60)] or list(range(len(chunks)))
+        clean = [chunks[j] for j in keep]
+        qv = query / np.linalg.norm(query)
+        sims = embs[keep] @ qv
+        flags = np.array([1 if has_keyword(p) else 0 for p in clean])
+        scores = sims + 0.2 * flags
+        return [clean[j] for j in np.argsort(scores)[::-1][:args.top_k]]
+
+    qv = query / np.linalg.norm(query)
+
+    def vectorised(i):
+        chunks, embs = firms[i], vectors[i]
+        clean = drop_noise(chunks, 5, 60)
+        index = {c: j for j, c in enumerate(chunks)}
+        sims = embs[[index[p] for p in clean]] @ qv
+        scores = sims + 0.2 * contains_flags(clean, KEYWORD_PATTERN)
+        return [clean[j] for j in top_indices(scores, args.top_k)]
+
+    ids = list(range(len(firms)))
+    drop_noise(firms[0], 5, 60)  # build the character tables outside the timing
+    t_ref, ref = _timed(reference, ids, args.repeat)
+    t_new, new = _timed(vectorised, ids, args.repeat)
+    # compared as chunk texts: equal scores of duplicate chunks may tie-break differently
+    differ = [i for i in ids if ref[i] != new[i]]
+    if differ:
+        raise SystemExit(f"top-{args.top_k} differs between loops and vectorised on {len(differ)} firms")
+    chunks = [p for firm in firms for p in firm]
+    changed = sum(has_keyword(p) != any(kw in p.lower() for kw in KEYWORDS) for p in chunks)
+    n = len(chunks)
+    print(f"{len(firms)} firms, {n} chunks ({n / len(firms):.0f}/firm), identical top-{args.top_k} on all")
+    print(f"keyword flag differs from the old `kw in p.lower()` rule on {changed}/{n} chunks")
+    print(f"loops:      {1e3 * t_ref / len(firms):7.3f} ms/firm")
+    print(f"vectorised: {1e3 * t_new / len(firms):7.3f} ms/firm  ({t_ref / t_new:.1f}x)")
+
+
+def bench_batching(args):
+    """Per-firm encode calls vs. concurrent firms through the batching embedding service."""
+    from concurrent.futures import ThreadPoolExecutor
+    import embedder
+
+    firms = _site_chunks(args.dir)
+    if not firms:
+        raise SystemExit(f"no pages with text in {args.dir}")
+    n = sum(len(c) for c in firms)
+
+    embedder.warm_up()
+    start = time.perf_counter()
+    for chunks in firms:
+        embedder.encode(chunks)
+    t_local = time.perf_counter() - start
+
+    embedder.start_service(args.addr)
+    embedder.warm_up()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as pool:
+        list(pool.map(embedder.encode, firms))
+    t_service = time.perf_counter() - start
+
+    print(f"{len(firms)} firms, {n} chunks")
+    print(f"per-firm:  {n / t_local:8.1f} chunks/s")
+    print(f"batched:   {n / t_service:8.1f} chunks/s  ({t_local / t_service:.1f}x, {args.clients} clients)")
+    print(f"service:   {embedder.service_stats()}")
+
+
+def bench_backends(args):
+    """
+    Embedding backends on the same firms: encode throughput, and how much of
+    each firm's top-k (embed_and_rank_paragraphs scoring) matches the first
+    backend's. Exits non-zero if a backend's mean overlap is below --min-overlap.
+    """
+    import embedder
+    from scrape import KEYWORD_PATTERN, contains_flags, drop_noise, top_indices
+
+    query = "Industries: Healthcare, Software, Fintech, Retail, Agriculture, Biotech"
+    firms = [drop_noise(chunks, 5, 60) for chunks in _site_chunks(args.dir)]
+    firms = [chunks for chunks in firms if len(chunks) > args.top_k]
+    if not firms:
+        raise SystemExit(f"no firms with more than {args.top_k} chunks in {args.dir}")
+    n = sum(len(c) for c in firms)
+    flags = [contains_flags(chunks, KEYWORD_PATTERN) for chunks in firms]
+
+    reference = None
+    failed = False
+    for backend in args.backends:
+        model = embedder.load_backend(backend)
+        embedder.encode_with(model, ["warm up"])
+        start = time.perf_counter()
+        vectors = [embedder.encode_with(model, chunks) for chunks in firms]
+        elapsed = time.perf_counter() - start
+        qv = embedder.encode_with(model, [query])[0]
+        tops = [set(top_indices(v @ qv + 0.2 * f, args.top_k)) for v, f in zip(vectors, flags)]
+
+        line = f"{backend:12s} {n / elapsed:8.1f} chunks/s"
+        if reference is None:
+            reference = (tops, elapsed)
+        else:
+            overlap = np.array([len(a & b) / args.top_k for a, b in zip(tops, reference[0])])
+            line += (f"  ({reference[1] / elapsed:.2f}x)  top-{args.top_k} overlap "
+                     f"mean {overlap.mean():.3f} min {overlap.min():.3f}")
+            failed |= overlap.mean() < args.min_overlap
+        print(line)
+    print(f"{len(firms)} firms, {n} chunks")
+    if failed:
+        raise SystemExit(f"top-{args.top_k} overlap below {args.min_overlap}")
+
+
+def bench_profiles(args):
+    """
+    LeadershipCrawler profile extraction on saved team pages: find/get_text
+    per container vs. the single PageIndex walk. Recall is the share of the
+    names the tree extractor finds that the single pass also finds. --nest
+    wraps every page in that many extra divs, the case where per-container
+    get_text goes quadratic.
+    """
+    from bs4 import BeautifulSoup
+    from people_scrape import LeadershipCrawler
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.dir, "*.html"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        if args.nest:
+            html = "<div>" * args.nest + html + "</div>" * args.nest
+        pages.append((path, html, BeautifulSoup(html, "html.parser")))
+    if not pages:
+        raise SystemExit(f"no .html files in {args.dir}")
+    crawler = LeadershipCrawler("https://bench.invalid", verbose=False)
+
+    timings = {}
+    names = {}
+    for label, fn in [("tree", crawler._extract_profiles_tree),
+                      ("single", crawler._extract_profiles_single_pass)]:
+        per_page = []
+        found = []
+        for path, html, soup in pages:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.process_time()
+                records = fn(soup, path)
+                best = min(best, time.process_time() - start)
+            per_page.append(best)
+            found.append({rec["name"] for rec in records})
+        timings[label] = np.array(per_page)
+        names[label] = found
+
+    kb = np.array([len(html) / 1e3 for _, html, _ in pages])
+    ref = sum(len(s) for s in names["tree"])
+    hit = sum(len(a & b) for a, b in zip(names["tree"], names["single"]))
+    extra = sum(len(b - a) for a, b in zip(names["tree"], names["single"]))
+    print(f"{len(pages)} pages, {kb.sum():.0f} KB, nest={args.nest}")
+    for label, t in timings.items():
+        ms_kb = 1e3 * t / kb
+        print(f"{label:6s}: {t.sum():7.3f}s CPU  {1e3 * t.mean():8.2f} ms/page  "
+              f"{ms_kb.mean():6.3f} ms/KB mean  {ms_kb.max():6.3f} ms/KB worst")
+    print(f"speedup {timings['tree'].sum() / timings['single'].sum():.1f}x")
+    print(f"names: tree {ref}, single {hit + extra}, recall {hit / max(ref, 1):.3f}, +{extra} not found by tree")
+
+
+_BIO_SENTENCES = [
+    "{name} is a Managing Director at the firm and serves on the board of several portfolio companies.",
+    "Prior to joining, {name} was a Vice President in the investment banking division of a global bank.",
+    "{name} received an MBA from Harvard Business School and a BA in Economics from Duke University.",
+    "{name} is active in the local church and serves on the board of a faith-based nonprofit.",
+    "Outside of work, {name} enjoys hiking, skiing and spending time with family.",
+    "{name} previously served as Chief Financial Officer and later as President of a software company.",
+    "{name} began their career as an Analyst at a consulting firm focused on industrial clients.",
+    "{name} co-founded the firm in 2004 and leads the healthcare practice.",
+    "{name} is a Senior Associate focused on business services and consumer investments!",
+    "Before that, {name} worked in operations at a logistics startup in Austin, Texas.",
+]
+_BIO_NAMES = ["Alice Smith", "Justin Park", "Our Team", "Maria Lopez", "Home Services", "Wei Chen",
+              "Thomas Weston", "About Us", "Priya Patel", "Investment Committee"]
+_BIO_POSITIONS = ["", "Partner", "Principal", "Vice President", "Director of Operations", "Board Member",
+                  "Chief Investment Officer, Partner", "Operating Advisor"]
+
+
+def _bio_records(path, minimum, seed=0):
+    """Rows of a bios.csv (name, position, bio, source_url), topped up with synthetic ones."""
+    import csv
+
+    records = []
+    if path and os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            records = [row for row in csv.DictReader(f)]
+    real = len(records)
+    rng = np.random.default_rng(seed)
+    while len(records) < minimum:
+        name = _BIO_NAMES[rng.integers(len(_BIO_NAMES))]
+        sentences = rng.choice(_BIO_SENTENCES, size=rng.integers(2, 10))
+        records.append({"name": name, "position": _BIO_POSITIONS[rng.integers(len(_BIO_POSITIONS))],
+                        "bio": " ".join(s.format(name=name) for s in sentences), "source_url": ""})
+    return records, real
+
+
+def bench_titles(args):
+    """
+    Per-record people classification: the old per-keyword loops (exclusion
+    list, role words, ~30 title regexes plus a faith pass) vs. the compiled
+    patterns and a single scan per bio. Exits non-zero if any result differs.
+    """
+    import main_people as mp
+    import people_scrape as ps
+
+    records, real = _bio_records(args.csv, args.min_records)
+    role_words = ps.ROLE_WORDS
+
+    def reference(rec):
+        name, position, bio = rec["name"], rec["position"], rec["bio"]
+        excluded = any(ex.lower() in name.lower() for ex in ps.EXCLUDE_NAME_PREFIXES)
+        t = position.lower()
+        title = bool(position) and len(position) <= 80 and (
+            any(w in t for w in role_words) or ("," in position and len(position) <= 60))
+        found = [canon for canon, pat in mp.TITLE_PATTERNS if pat.search(bio)]
+        bio_pos = min(found, key=lambda c: mp.SENIORITY_RANK_HIGH.get(c, 9999)) if found else None
+        heading = position.strip()
+        if heading and bio_pos:
+            h = mp.SENIORITY_RANK_HIGH.get(heading.lower(), 9999)
+            best = bio_pos if mp.SENIORITY_RANK_HIGH.get(bio_pos, 9999) < h else heading
+        else:
+            best = heading or bio_pos or ""
+        matches = [s.strip() for s in mp.SENTENCE_SPLIT_REGEX.split(bio) if mp.FAITH_REGEX.search(s)]
+        faith = (1, " ".join(matches)) if bio and matches else (0, "")
+        return excluded, title, best, faith
+
+    crawler = ps.LeadershipCrawler("https://bench.invalid", verbose=False)
+
+    def compiled(rec):
+        name, position, bio = rec["name"], rec["position"], rec["bio"]
+        scan = mp.scan_bio(bio)
+        return (ps._is_excluded_name(name), crawler._looks_like_title(position),
+                mp.choose_best_position(position, bio, scan), mp.compute_faith_score(bio, scan))
+
+    t_ref, ref = _timed(reference, records, args.repeat)
+    t_new, new = _timed(compiled, records, args.repeat)
+    diff = sum(a != b for a, b in zip(ref, new))
+    kb = sum(len(rec["bio"]) for rec in records) / 1e3
+    print(f"{len(records)} records ({real} from {args.csv}), {kb:.0f} KB of bios")
+    print(f"loops:    {1e6 * t_ref / len(records):8.1f} us/record")
+    print(f"compiled: {1e6 * t_new / len(records):8.1f} us/record  ({t_ref / t_new:.1f}x)")
+    print(f"results differ on {diff}/{len(records)} records")
+    if diff:
+        raise SystemExit("compiled classifiers disagree with the reference")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("fetch", help="save homepages from a firms csv")
+    p.add_argument("csv")
+    p.add_argument("out")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--paths", nargs="+", default=[""], help="paths to fetch on every site (default: homepage)")
+    p.set_defaults(fn=fetch_pages)
+
+    p = sub.add_parser("extract", help="HTML -> chunks throughput")
+    p.add_argument("dir")
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(fn=bench_extract)
+
+    p = sub.add_parser("rank", help="per-firm chunk ranking cost")
+    p.add_argument("dir")
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--top-k", type=int, default=30)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(fn=bench_rank)
+
+    p = sub.add_parser("batching", help="cross-firm batching in the embedding service")
+    p.add_argument("dir")
+    p.add_argument("--clients", type=int, default=8)
+    p.add_argument("--addr", default="127.0.0.1:6011")
+    p.set_defaults(fn=bench_batching)
+
+    p = sub.add_parser("backends", help="embedding backend throughput and top-k parity")
+    p.add_argument("dir")
+    p.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx", "onnx-int8"])
+    p.add_argument("--top-k", type=int, default=10)
+    p.add_argument("--min-overlap", type=float, default=0.8)
+    p.set_defaults(fn=bench_backends)
+
+    p = sub.add_parser("profiles", help="team-page profile extraction recall and CPU")
+    p.add_argument("dir")
+    p.add_argument("--nest", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(fn=bench_profiles)
+
+    p = sub.add_parser("titles", help="name/title/faith classification per bio record")
+    p.add_argument("csv", nargs="?", default="../bios.csv")
+    p.add_argument("--min-records", type=int, default=5000, help="pad with synthetic bios up to this many")
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(fn=bench_titles)
+
+    args = parser.parse_args()
+    args.fn(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from document import chunk_blocks
+
+# A block (heading/paragraph) repeated on at least this many of a firm's
+# pages, and on at least BOILERPLATE_PAGE_SHARE of them, is navigation,
+# footer or banner text: only its first occurrence is kept.
+BOILERPLATE_MIN_PAGES = int(os.environ.get("BOILERPLATE_MIN_PAGES", 3))
+BOILERPLATE_PAGE_SHARE = float(os.environ.get("BOILERPLATE_PAGE_SHARE", 0.3))
+
+# Chunks whose word-shingle sets overlap at least this much (Jaccard,
+# estimated by MinHash) with an earlier chunk are treated as the same chunk.
+NEAR_DUP_JACCARD = float(os.environ.get("NEAR_DUP_JACCARD", 0.7))
+MINHASH_PERMS = 64
+MINHASH_BANDS = 16  # x 4 rows: pairs above ~0.5 Jaccard become candidates
+SHINGLE_WORDS = 3
+
+# Blocks seen on at least this many *firms* in this process (cookie banners,
+# "powered by" footers, ...) are dropped everywhere; 0 disables.
+BOILERPLATE_CROSS_FIRM = int(os.environ.get("BOILERPLATE_CROSS_FIRM", 0))
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_DIGITS = re.compile(r"\d+")
+
+
+def block_key(text):
+    """Normalised identity of a block: case, punctuation, whitespace and numbers (dates) ignored."""
+    return _NON_WORD.sub(" ", _DIGITS.sub("0", text.lower())).strip()
+
+
+def _hash64(items):
+    return np.array([int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+                     for s in items], dtype=np.uint64)
+
+
+_rng = np.random.default_rng(0x5EED)
+_PERM_A = _rng.integers(1, 2**63, MINHASH_PERMS, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, MINHASH_PERMS, dtype=np.uint64)
+
+
+def shingles(text, k=SHINGLE_WORDS):
+    """Word k-shingles of the normalised text (the words themselves if shorter)."""
+    words = block_key(text).split()
+    if len(words) <= k:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash(text):
+    """MinHash signature (MINHASH_PERMS uint64s) of the text's shingle set."""
+    hashes = _hash64(shingles(text))
+    with np.errstate(over="ignore"):
+        return (hashes[:, None] * _PERM_A + _PERM_B).min(axis=0)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of the chunks kept so far, bucketed by LSH band so a
+    new chunk is only compared against chunks sharing at least one band.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_JACCARD, bands=MINHASH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = MINHASH_PERMS // bands
+        self.buckets = defaultdict(list)
+
+    def add_if_new(self, sig):
+        """Index sig and return True, unless a near duplicate is already indexed."""
+        keys = [(b, sig[b * self.rows:(b + 1) * self.rows].tobytes()) for b in range(self.bands)]
+        for key in keys:
+            for other in self.buckets.get(key, ()):
+                if (sig == other).mean() >= self.threshold:
+                    return False
+        for key in keys:
+            self.buckets[key].append(sig)
+        return True
+
+
+class CrossFirmBlocks:
+    """Counts, per process, how many firms each block key has appeared on."""
+
+    def __init__(self, min_firms):
+        self.min_firms = min_firms
+        self.firms = Counter()
+
+    def observe(self, keys):
+        self.firms.update(set(keys))
+
+    def __contains__(self, key):
+        return self.firms[key] >= self.min_firms
+
+
+_cross_firm = CrossFirmBlocks(BOILERPLATE_CROSS_FIRM) if BOILERPLATE_CROSS_FIRM else None
+
+
+def repeated_blocks(pages, min_pages=BOILERPLATE_MIN_PAGES, page_share=BOILERPLATE_PAGE_SHARE):
+    """Keys of the blocks that repeat across enough of the pages to be boilerplate."""
+    on_pages = Counter()
+    for blocks in pages:
+        on_pages.update({block_key(text) for _, text in blocks})
+    threshold = max(min_pages, page_share * len(pages))
+    return {key for key, n in on_pages.items() if n >= threshold}
+
+
+def strip_boilerplate(document, cross_firm=None):
+    """
+    Chunks of a SiteDocument with cross-page boilerplate removed: repeated
+    blocks survive only where they first appear, and chunks that are near
+    duplicates (MinHash) of an earlier chunk are dropped.
+    """
+    cross_firm = cross_firm if cross_firm is not None else _cross_firm
+    pages = [page.blocks for page in document.pages]
+    repeated = repeated_blocks(pages)
+
+    seen = set()
+    chunks = []
+    for blocks in pages:
+        kept = []
+        for tag, text in blocks:
+            key = block_key(text)
+            if cross_firm is not None and key in cross_firm:
+                continue
+            if key in repeated:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append((tag, text))
+        chunks.extend(chunk_blocks(kept))
+
+    if cross_firm is not None:
+        cross_firm.observe(block_key(text) for blocks in pages for _, text in blocks)
+
+    index = NearDuplicateIndex()
+    return [chunk for chunk in chunks if index.add_if_new(minhash(chunk))]
@@ -0,0 +1,107 @@
+import json
+import os
+import shutil
+
+from psycopg2.extras import execute_values
+
+from document import SiteDocument
+
+STAGES = ("crawled", "ranked", "llm_done", "saved")
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", ".checkpoints")
+_STAGE_ARRAY = "ARRAY[" + ", ".join(f"'{stage}'" for stage in STAGES) + "]"
+
+
+class FirmProgress:
+    """
+    Per-firm pipeline stage in the firm_progress table, plus what each stage
+    leaves on disk so a restarted run resumes after the last finished stage
+    instead of re-crawling:
+
+        crawled   <dir>/<firm_id>/document.json.gz    (SiteDocument)
+        ranked    snippets.json + embeddings.npy/.json (FirmEmbeddings)
+        llm_done  theses.json                          ({industry: thesis})
+        saved     nothing; the firm is skipped and its directory removed
+
+    Stages only move forward; marking an earlier stage again is a no-op.
+    """
+
+    def __init__(self, pool, path=CHECKPOINT_DIR):
+        self.pool = pool
+        self.path = path
+
+    def load(self):
+        """{firm_id: stage} for every firm with a checkpoint, in one query."""
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT firm_id, stage FROM firm_progress;")
+                stages = dict(cur.fetchall())
+            conn.commit()
+        finally:
+            self.pool.putconn(conn)
+        return stages
+
+    def mark(self, firms, stage):
+        """Record `stage` for firms given as {firm_id: name}."""
+        if not firms:
+            return
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                execute_values(cur, f"""
+                    INSERT INTO firm_progress (firm_id, name, stage)
+                    VALUES %s
+                    ON CONFLICT (firm_id) DO UPDATE
+                    SET stage = EXCLUDED.stage, updated = now()
+                    WHERE array_position({_STAGE_ARRAY}, EXCLUDED.stage)
+                        > array_position({_STAGE_ARRAY}, firm_progress.stage);
+                """, [(firm_id, name, stage) for firm_id, name in firms.items()], page_size=len(firms))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+        if stage == "saved":
+            for firm_id in firms:
+                shutil.rmtree(self.dir(firm_id), ignore_errors=True)
+
+    def dir(self, firm_id):
+        return os.path.join(self.path, str(firm_id).replace("/", "_"))
+
+    def _file(self, firm_id, name):
+        os.makedirs(self.dir(firm_id), exist_ok=True)
+        return os.path.join(self.dir(firm_id), name)
+
+    # ---- stage artifacts ----
+
+    def save_document(self, firm_id, document):
+        document.save(self._file(firm_id, "document.json.gz"))
+
+    def load_document(self, firm_id):
+        path = os.path.join(self.dir(firm_id), "document.json.gz")
+        return SiteDocument.load(path) if os.path.exists(path) else None
+
+    def save_ranked(self, firm_id, snippets, embeddings):
+        embeddings.save(self._file(firm_id, "embeddings"))
+        with open(self._file(firm_id, "snippets.json"), "w", encoding="utf-8") as f:
+            json.dump(snippets, f, ensure_ascii=False)
+
+    def load_ranked(self, firm_id, embeddings_cls):
+        path = os.path.join(self.dir(firm_id), "snippets.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            snippets = json.load(f)
+        return snippets, embeddings_cls.load(os.path.join(self.dir(firm_id), "embeddings"))
+
+    def save_theses(self, firm_id, theses):
+        with open(self._file(firm_id, "theses.json"), "w", encoding="utf-8") as f:
+            json.dump(theses, f, ensure_ascii=False)
+
+    def load_theses(self, firm_id):
+        path = os.path.join(self.dir(firm_id), "theses.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
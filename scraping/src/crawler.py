@@ -0,0 +1,225 @@
+import asyncio
+import heapq
+from collections import deque
+from urllib.parse import urlparse, urljoin
+
+import aiohttp
+
+from extract import extract_page
+
+# Concurrency / politeness limits for the async engine
+MAX_CONCURRENCY = 16
+PER_HOST_CONCURRENCY = 4
+REQUEST_TIMEOUT = 10
+
+# Pages whose static HTML carries fewer heading/paragraph characters than
+# this are assumed to be rendered client-side and get re-loaded in Chrome.
+MIN_STATIC_CHARS = 200
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (pe-scraper/1.0)"}
+
+# Statuses that usually mean the static fetch was blocked or throttled
+# (bot filters, rate limits, flaky origins), not that the page is gone: the
+# page is loaded in Chrome instead, as the Selenium-only crawler did.
+RENDER_STATUS = {403, 429}
+
+# Only these mean the host could not be reached at all (DNS, refused,
+# timeout); they are the failures reported to `on_failure`.
+CONNECTION_ERRORS = (aiohttp.ClientConnectorError, aiohttp.ServerTimeoutError, asyncio.TimeoutError)
+
+# Path fragments that tend to hold investment-focus text, visited first when
+# the frontier is prioritised.
+PRIORITY_PATHS = {
+    "strategy": 3, "portfolio": 3, "invest": 2, "focus": 2, "sector": 2,
+    "industr": 2, "approach": 2, "criteria": 2, "about": 1, "what-we-do": 1,
+}
+
+
+def path_priority(url):
+    path = urlparse(url).path.lower()
+    return sum(w for kw, w in PRIORITY_PATHS.items() if kw in path)
+
+
+class Frontier:
+    """
+    Crawl frontier with O(1) membership checks. URLs are served FIFO from a
+    deque, or highest-`score` first (FIFO among ties) when a scorer is given.
+    It is unbounded: callers count `max_pages` against the pages they visit,
+    so a high-priority link found late still goes ahead of the low-priority
+    ones queued before it.
+    """
+
+    def __init__(self, score=None):
+        self.score = score
+        self.queue = deque()
+        self.heap = []
+        self.enqueued = set()
+
+    def push(self, url):
+        if url in self.enqueued:
+            return False
+        self.enqueued.add(url)
+        if self.score:
+            heapq.heappush(self.heap, (-self.score(url), len(self.enqueued), url))
+        else:
+            self.queue.append(url)
+        return True
+
+    def pop(self):
+        if self.score:
+            return heapq.heappop(self.heap)[2]
+        return self.queue.popleft()
+
+    def __contains__(self, url):
+        return url in self.enqueued
+
+    def __len__(self):
+        return len(self.heap) if self.score else len(self.queue)
+
+
+def filter_links(hrefs, url, base_domain, exclude_keywords):
+    """Yield the same-domain, non-excluded links among raw href values."""
+    for href in hrefs:
+        href = urljoin(url, href)
+        p2 = urlparse(href)
+        root_link = p2._replace(query="", fragment="").geturl()
+        if p2.netloc.replace("www.", "") != base_domain:
+            continue
+        if any(kw in root_link.lower() for kw in exclude_keywords):
+            continue
+        yield root_link + (f"#{p2.fragment}" if p2.fragment else "")
+
+
+class AsyncCrawler:
+    """
+    Concurrent same-domain crawler over aiohttp. Pages are fetched as static
+    HTML; pages with almost no h1-h6/p text, and pages whose static fetch is
+    refused (403/429/5xx, protocol errors), are handed to `render` (a
+    blocking url -> html callable, e.g. backed by Selenium), which runs in a
+    worker thread so the event loop keeps fetching. Only connection failures
+    are reported to `on_failure`.
+    """
+
+    def __init__(self, start_url, document, max_pages=30, exclude_keywords=(),
+                 render=None, skip=(), on_failure=None, prioritize=True,
+                 max_concurrency=MAX_CONCURRENCY, per_host=PER_HOST_CONCURRENCY,
+                 min_static_chars=MIN_STATIC_CHARS):
+        self.start_url = start_url
+        self.document = document
+        self.max_pages = max_pages
+        self.exclude_keywords = exclude_keywords
+        self.render = render
+        self.skip = skip
+        self.on_failure = on_failure
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.min_static_chars = min_static_chars
+        self.base_domain = urlparse(start_url).netloc.replace("www.", "")
+        self.visited = set()
+        self.frontier = Frontier(score=path_priority if prioritize else None)
+        self.in_flight = 0
+        self.rendered = 0
+
+    async def run(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency,
+                                         limit_per_host=self.per_host,
+                                         ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers=HEADERS) as session:
+            self.changed = asyncio.Event()
+            self._enqueue(self.start_url)
+            await asyncio.gather(*(self._worker(session)
+                                   for _ in range(self.max_concurrency)))
+        print(f"[crawl] {self.base_domain}: {len(self.visited)} pages "
+              f"({self.rendered} rendered in Chrome)")
+        return self.document
+
+    def _enqueue(self, url):
+        if self.frontier.push(url):
+            self.changed.set()
+
+    async def _worker(self, session):
+        while True:
+            if not self.frontier or len(self.visited) >= self.max_pages:
+                if self.in_flight == 0:
+                    return
+                self.changed.clear()
+                await self.changed.wait()
+                continue
+            url = self.frontier.pop()
+            if url in self.visited:
+                continue
+            self.visited.add(url)
+            self.in_flight += 1
+            try:
+                await self._visit(session, url)
+            except Exception as e:
+                print(f"[skip] Error on {url} ({type(e).__name__}: {e})")
+            finally:
+                self.in_flight -= 1
+                self.changed.set()
+
+    async def _visit(self, session, url):
+        if url in self.skip:
+            print(f"[skip] Already in unreachable.csv: {url}")
+            return
+
+        html = None
+        try:
+            async with session.get(url.split('#')[0], allow_redirects=True) as res:
+                if res.status in RENDER_STATUS or res.status >= 500:
+                    reason = f"HTTP {res.status}"
+                elif res.status >= 400:
+                    print(f"[skip] HTTP {res.status}: {url}")
+                    return
+                elif "html" not in res.headers.get("Content-Type", "text/html"):
+                    return
+                else:
+                    html = await res.text(errors="replace")
+        except CONNECTION_ERRORS as e:
+            self._failed(url, type(e).__name__)
+            return
+        except aiohttp.ClientError as e:
+            reason = type(e).__name__
+
+        if html is None:
+            # static fetch refused or broken: let the browser try
+            page = await self._render(url)
+            if page is None:
+                print(f"[skip] {url} ({reason})")
+                return
+            print("Visiting:", url)
+        else:
+            print("Visiting:", url)
+            page = await asyncio.to_thread(extract_page, html)
+            if page.text_chars < self.min_static_chars:
+                page = await self._render(url) or page
+
+        self.document.add_page(url, page.blocks, page.chunks)
+
+        for candidate in filter_links(page.links, url, self.base_domain, self.exclude_keywords):
+            if candidate not in self.visited:
+                self._enqueue(candidate)
+
+    async def _render(self, url):
+        """The page as loaded by `render`, or None without one or if it fails."""
+        if not self.render:
+            return None
+        try:
+            html = await asyncio.to_thread(self.render, url)
+        except Exception as e:
+            print(f"[render] Could not load {url} in Chrome ({type(e).__name__})")
+            return None
+        self.rendered += 1
+        return await asyncio.to_thread(extract_page, html)
+
+    def _failed(self, url, reason):
+        print(f"[skip] Unreachable: {url} ({reason})")
+        if self.on_failure:
+            self.on_failure(url, reason)
+
+
+def crawl_site_async(start_url, document, max_pages=30, **kwargs):
+    """Blocking entry point: run an AsyncCrawler to completion, filling document."""
+    return asyncio.run(AsyncCrawler(start_url, document, max_pages=max_pages, **kwargs).run())
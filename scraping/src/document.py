@@ -0,0 +1,149 @@
+import gzip
+import json
+import os
+
+PAGE_BREAK = "---PAGE BREAK---"
+
+
+class ChunkBuilder:
+    """
+    Incremental form of chunk_text: feed lines (or newline-terminated text)
+    as they are produced and collect the same chunks chunk_text would return
+    for the whole text.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.current = []
+
+    def feed_line(self, line):
+        stripped = line.strip()
+        if stripped == PAGE_BREAK:
+            if self.current:
+                self.chunks.append("\n".join(self.current).strip())
+                self.current = []
+            return
+        if stripped == "":
+            if self.current and len(self.current) > 1:
+                self.chunks.append("\n".join(self.current).strip())
+                self.current = []
+            return
+        self.current.append(line)
+
+    def feed_text(self, text):
+        for line in text.splitlines():
+            self.feed_line(line)
+
+    def close(self):
+        if self.current:
+            self.chunks.append("\n".join(self.current).strip())
+            self.current = []
+        return self.chunks
+
+
+def chunk_text(lines):
+    """
+    Split text into chunks by single blank-line separators, but ensure that headers
+    stay with their following paragraphs. Page-break markers also split.
+    Returns a list of chunk strings.
+    """
+    builder = ChunkBuilder()
+    for line in lines:
+        builder.feed_line(line)
+    return builder.close()
+
+
+def format_block(tag, text):
+    """One heading/paragraph in the scraped_pages text format."""
+    if tag.startswith("h"):
+        return f"\n{text}\n"
+    return text + "\n"
+
+
+PAGE_END = f"\n{PAGE_BREAK}\n\n"
+
+
+def format_blocks(blocks):
+    """
+    Render one page's (tag, text) blocks in the scraped_pages text format:
+    headers on their own blank-line separated line, paragraphs one per line,
+    then a page break.
+    """
+    return "".join(format_block(tag, text) for tag, text in blocks) + PAGE_END
+
+
+def chunk_blocks(blocks):
+    """chunk_text() of one page's blocks, without building the page text."""
+    builder = ChunkBuilder()
+    for tag, text in blocks:
+        builder.feed_text(format_block(tag, text))
+    builder.feed_text(PAGE_END)
+    return builder.close()
+
+
+class Page:
+    def __init__(self, url, blocks, chunks=None):
+        self.url = url
+        self.blocks = blocks  # [(tag, text)] in document order
+        self.chunks = chunks  # precomputed by the streaming extractor, if any
+
+    def text(self):
+        return format_blocks(self.blocks)
+
+
+class SiteDocument:
+    """
+    A crawled site held in memory: pages -> ordered heading/paragraph blocks
+    -> chunks. Replaces the scraped_pages/<firm>.txt round trip; `spill`
+    writes the same text format gzipped, for debugging.
+    """
+
+    def __init__(self, start_url):
+        self.start_url = start_url
+        self.pages = []
+        self._chunks = None
+
+    def add_page(self, url, blocks, chunks=None):
+        self.pages.append(Page(url, blocks, chunks))
+        self._chunks = None
+
+    def text(self):
+        return "".join(page.text() for page in self.pages)
+
+    def lines(self):
+        return self.text().splitlines()
+
+    def chunks(self):
+        if self._chunks is None:
+            if all(page.chunks is not None for page in self.pages):
+                # page breaks always end a chunk, so pages chunk independently
+                self._chunks = [c for page in self.pages for c in page.chunks]
+            else:
+                self._chunks = chunk_text(self.lines())
+        return self._chunks
+
+    def spill(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(self.text())
+        return path
+
+    def save(self, path):
+        """Pages and blocks as gzipped JSON, so a resumed run can skip the crawl."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump({"start_url": self.start_url,
+                       "pages": [[page.url, page.blocks] for page in self.pages]}, f, ensure_ascii=False)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        document = cls(data["start_url"])
+        for url, blocks in data["pages"]:
+            document.add_page(url, [tuple(block) for block in blocks])
+        return document
+
+    def __len__(self):
+        return len(self.pages)
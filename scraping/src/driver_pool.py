@@ -0,0 +1,173 @@
+import atexit
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from multiprocessing import util
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.by import By
+
+# Total number of headless Chromes this process may keep alive.
+DRIVER_POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", 4))
+# A browser is quit and replaced after this many page loads to bound memory.
+DRIVER_MAX_PAGES = int(os.environ.get("DRIVER_MAX_PAGES", 100))
+
+
+def new_driver():
+    opts = Options()
+    opts.add_argument("--headless")
+    opts.add_argument("--disable-gpu")
+    opts.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.stylesheets": 2,
+        "profile.managed_default_content_settings.fonts": 2,
+    })
+    return webdriver.Chrome(options=opts)
+
+
+def load_page(driver, url):
+    driver.get(url.split('#')[0])
+    try:
+        WebDriverWait(driver, 3).until(
+            EC.presence_of_element_located((By.TAG_NAME, "body"))
+        )
+    except:
+        pass
+    return driver.page_source
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+class WebDriverPool:
+    """
+    Bounded pool of warm headless Chromes. Browsers are created lazily up to
+    `size`, health-checked when borrowed, and recycled after `max_pages` loads.
+    """
+
+    def __init__(self, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES, factory=new_driver):
+        self.size = size
+        self.max_pages = max_pages
+        self.factory = factory
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.closed = False
+
+    def warm(self, n=None):
+        """Start up to n browsers ahead of time so the first pages don't pay for it."""
+        started = []
+        try:
+            for _ in range(min(n or self.size, self.size)):
+                if not self.slots.acquire(blocking=False):
+                    break
+                try:
+                    started.append(_PooledDriver(self.factory()))
+                except Exception:
+                    self.slots.release()
+                    raise
+        finally:
+            # browsers started before a failure still join the pool
+            for pd in started:
+                self.idle.put(pd)
+                self.slots.release()
+
+    def acquire(self, timeout=None):
+        if not self.slots.acquire(timeout=timeout):
+            raise TimeoutError("no WebDriver available")
+        try:
+            while True:
+                try:
+                    pd = self.idle.get_nowait()
+                except queue.Empty:
+                    return _PooledDriver(self.factory())
+                if self._healthy(pd):
+                    return pd
+                self._quit(pd)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, pd, broken=False):
+        try:
+            if broken or self.closed or pd.pages >= self.max_pages:
+                self._quit(pd)
+            else:
+                self.idle.put(pd)
+        finally:
+            self.slots.release()
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        pd = self.acquire(timeout)
+        broken = False
+        try:
+            yield pd
+        except Exception:
+            broken = not self._healthy(pd)
+            raise
+        finally:
+            self.release(pd, broken=broken)
+
+    def render(self, url):
+        """Load url in a pooled browser and return the rendered HTML."""
+        with self.borrow() as pd:
+            pd.pages += 1
+            return load_page(pd.driver, url)
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self._quit(self.idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def _healthy(self, pd):
+        try:
+            pd.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, pd):
+        try:
+            pd.driver.quit()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES):
+    """Configure this process's pool; also usable as a ProcessPoolExecutor initializer."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = WebDriverPool(size=size, max_pages=max_pages)
+        # pool worker processes skip atexit hooks but do run finalizers
+        util.Finalize(None, close_pool, exitpriority=10)
+        return _pool
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WebDriverPool()
+        return _pool
+
+
+@atexit.register
+def close_pool():
+    if _pool is not None:
+        _pool.close()
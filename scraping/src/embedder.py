@@ -0,0 +1,291 @@
+import os
+import queue
+import threading
+import time
+from multiprocessing import Process, Event
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+MODEL_NAME = os.environ.get("EMBED_MODEL", 'sentence-transformers/all-MiniLM-L6-v2')
+# model = SentenceTransformer('Qwen/Qwen3-Embedding-0.6B')
+
+# Inference backend for the model, see BACKENDS:
+#   torch       full-precision PyTorch (default)
+#   torch-int8  PyTorch with Linear layers dynamically quantized to int8
+#   onnx        ONNX Runtime (needs optimum[onnxruntime])
+#   onnx-int8   ONNX Runtime running the int8-quantized export in EMBED_ONNX_FILE
+EMBED_BACKEND = os.environ.get("EMBED_BACKEND", "torch")
+EMBED_ONNX_FILE = os.environ.get("EMBED_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+
+# "host:port" of a shared embedding service; when set, encode() goes there
+# instead of loading the model in this process.
+EMBED_SERVICE_ADDR = os.environ.get("EMBED_SERVICE_ADDR")
+AUTHKEY = os.environ.get("EMBED_SERVICE_KEY", "pe-embed").encode()
+
+# Service-side batching: requests from all connected processes are pooled
+# for up to EMBED_MAX_WAIT seconds (or until EMBED_MAX_BATCH texts are
+# waiting), sorted by length and encoded together in EMBED_BATCH_SIZE batches.
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", 64))
+EMBED_MAX_BATCH = int(os.environ.get("EMBED_MAX_BATCH", 1024))
+EMBED_MAX_WAIT = float(os.environ.get("EMBED_MAX_WAIT", 0.05))
+
+_model = None
+_model_lock = threading.Lock()
+_encode_lock = threading.Lock()
+_client = threading.local()
+
+
+def _load_torch(name, device=None):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name, device=device)
+
+
+def _load_torch_int8(name):
+    import torch
+    model = _load_torch(name, device="cpu")  # dynamic quantization is CPU-only
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_onnx(name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name, backend="onnx")
+
+
+def _load_onnx_int8(name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name, backend="onnx", model_kwargs={"file_name": EMBED_ONNX_FILE})
+
+
+# name -> loader(model_name) returning an object with SentenceTransformer's
+# encode() and get_sentence_embedding_dimension()
+BACKENDS = {
+    "torch": _load_torch,
+    "torch-int8": _load_torch_int8,
+    "onnx": _load_onnx,
+    "onnx-int8": _load_onnx_int8,
+}
+
+
+def register_backend(name, loader):
+    BACKENDS[name] = loader
+
+
+def load_backend(backend, name=MODEL_NAME):
+    try:
+        loader = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"unknown EMBED_BACKEND {backend!r} (choose from {', '.join(BACKENDS)})") from None
+    return loader(name)
+
+
+def cache_namespace():
+    """Key for cached vectors: quantized/ONNX vectors differ slightly from torch ones."""
+    return MODEL_NAME if EMBED_BACKEND == "torch" else f"{MODEL_NAME}@{EMBED_BACKEND}"
+
+
+def get_model():
+    """Process-wide embedding model for EMBED_BACKEND, loaded on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_backend(EMBED_BACKEND)
+    return _model
+
+
+def encode_with(model, texts):
+    """Unit-length float32 vectors from any backend's model."""
+    return model.encode(texts, batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True,
+                        normalize_embeddings=True).astype(np.float32)
+
+
+def _local_encode(texts):
+    with _encode_lock:
+        return encode_with(get_model(), texts)
+
+
+def _local_dim():
+    return get_model().get_sentence_embedding_dimension()
+
+
+def encode(texts):
+    """Encode a list of texts to unit-length float32 vectors."""
+    if EMBED_SERVICE_ADDR:
+        return _request("encode", list(texts))
+    return _local_encode(texts)
+
+
+def embedding_dim():
+    if EMBED_SERVICE_ADDR:
+        return _request("dim", None)
+    return _local_dim()
+
+
+def service_stats():
+    """Batching counters of the embedding service, or None when encoding locally."""
+    if EMBED_SERVICE_ADDR:
+        return _request("stats", None)
+    return None
+
+
+def warm_up():
+    """Load the model (or connect to the service) before the first real request."""
+    encode(["warm up"])
+
+
+# ---- shared embedding service ----
+
+def _parse_addr(addr):
+    host, port = addr.rsplit(":", 1)
+    return host, int(port)
+
+
+def _request(op, payload):
+    conn = getattr(_client, "conn", None)
+    if conn is None or _client.pid != os.getpid():
+        conn = _client.conn = Client(_parse_addr(EMBED_SERVICE_ADDR), authkey=AUTHKEY)
+        _client.pid = os.getpid()
+    try:
+        conn.send((op, payload))
+        status, result = conn.recv()
+    except (EOFError, OSError):
+        _client.conn = None
+        raise
+    if status == "error":
+        raise RuntimeError(f"embedding service: {result}")
+    return result
+
+
+class _Pending:
+    __slots__ = ("texts", "done", "result", "error")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class EmbedBatcher:
+    """
+    Gathers encode requests from many callers into large batches. The first
+    request opens a window of `max_wait` seconds (closed early once
+    `max_batch` texts are waiting); every text in the window is
+    deduplicated, sorted by length so each model batch pads little, encoded
+    in one call, and the rows are routed back to their callers.
+    """
+
+    def __init__(self, encode_fn, max_batch=EMBED_MAX_BATCH, max_wait=EMBED_MAX_WAIT):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.batches = self.texts = 0
+        self.busy = 0.0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def encode(self, texts):
+        if not texts:
+            return self.encode_fn([])
+        pending = _Pending(texts)
+        self.requests.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _run(self):
+        while True:
+            batch = [self.requests.get()]
+            size = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = self.requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                size += len(pending.texts)
+            self._encode(batch)
+
+    def _encode(self, batch):
+        started = time.monotonic()
+        try:
+            unique = sorted(set(t for pending in batch for t in pending.texts), key=len)
+            vectors = self.encode_fn(unique)
+            row = {t: i for i, t in enumerate(unique)}
+            for pending in batch:
+                pending.result = vectors[[row[t] for t in pending.texts]]
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+        finally:
+            self.batches += 1
+            self.texts += sum(len(pending.texts) for pending in batch)
+            self.busy += time.monotonic() - started
+            for pending in batch:
+                pending.done.set()
+
+    def stats(self):
+        return {"batches": self.batches, "texts": self.texts,
+                "texts_per_batch": round(self.texts / self.batches, 1) if self.batches else 0.0,
+                "texts_per_sec": round(self.texts / self.busy, 1) if self.busy else 0.0}
+
+
+_batcher = None
+
+
+def _handle(conn):
+    with conn:
+        while True:
+            try:
+                op, payload = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if op == "encode":
+                    conn.send(("ok", _batcher.encode(payload)))
+                elif op == "dim":
+                    conn.send(("ok", _local_dim()))
+                elif op == "stats":
+                    conn.send(("ok", _batcher.stats()))
+                else:
+                    conn.send(("error", f"unknown op {op!r}"))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def serve(addr, ready=None):
+    """
+    Load the model once and answer encode requests from other processes,
+    batching concurrent requests across callers (see EmbedBatcher).
+    """
+    global _batcher
+    listener = Listener(_parse_addr(addr), backlog=128, authkey=AUTHKEY)
+    _local_encode(["warm up"])
+    _batcher = EmbedBatcher(_local_encode)
+    print(f"[Embedding Service] {MODEL_NAME} ({EMBED_BACKEND}) listening on {addr}")
+    if ready is not None:
+        ready.set()
+    while True:
+        conn = listener.accept()
+        threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+
+
+def start_service(addr="127.0.0.1:6010"):
+    """
+    Start the embedding service in a daemon process and route this process
+    (and any process forked from it afterwards) through it.
+    """
+    global EMBED_SERVICE_ADDR
+    ready = Event()
+    proc = Process(target=serve, args=(addr, ready), daemon=True)
+    proc.start()
+    ready.wait()
+    EMBED_SERVICE_ADDR = addr
+    os.environ["EMBED_SERVICE_ADDR"] = addr
+    return proc
@@ -0,0 +1,181 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+EMBED_CACHE_DIR = os.environ.get("EMBED_CACHE_DIR", ".embedding_cache")
+# Rows kept per model; at 384 dims float16 that is ~0.75 KB per chunk.
+EMBED_CACHE_MAX_ROWS = int(os.environ.get("EMBED_CACHE_MAX_ROWS", 200_000))
+
+KEY_BYTES = 20  # sha1
+
+
+def chunk_key(model_name, text):
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, size-bounded embedding store for one model.
+
+    Vectors live in a memory-mapped float16 matrix; a parallel key matrix
+    records which chunk hash occupies each row, so the hash index is rebuilt
+    from disk on open. When full, the least-recently-used row is reused.
+
+    Only one process holds the writer lock at a time. Other processes open
+    the cache read-only: they serve hits but do not insert, and they check
+    the row's key before and after reading it, so a row reused by the writer
+    is treated as a miss rather than returning the wrong vector. On a miss a
+    reader picks up the rows the writer has stored since it last looked
+    (rows whose tick moved past the reader's), so new entries become
+    visible without reopening.
+    """
+
+    def __init__(self, model_name, dim, path=EMBED_CACHE_DIR, capacity=EMBED_CACHE_MAX_ROWS):
+        self.model_name = model_name
+        self.dim = dim
+        self.dir = os.path.join(path, model_name.replace("/", "__"))
+        os.makedirs(self.dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+        self._lock_file = open(os.path.join(self.dir, "writer.lock"), "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self.writable = True
+        except OSError:
+            self.writable = False
+
+        meta_path = os.path.join(self.dir, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            capacity = meta["capacity"]
+            if meta["dim"] != dim:
+                raise ValueError(f"embedding cache {self.dir} has dim {meta['dim']}, expected {dim}")
+        elif self.writable:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model": model_name, "dim": dim, "capacity": capacity}, f)
+        else:
+            raise RuntimeError(f"embedding cache {self.dir} is being created by another process")
+        self.capacity = capacity
+
+        mode = "r+" if self.writable else "r"
+        self.vectors = self._open("vectors.npy", np.float16, (capacity, dim), mode)
+        self.keys = self._open("keys.npy", np.uint8, (capacity, KEY_BYTES), mode)
+        self.ticks = self._open("ticks.npy", np.int64, (capacity,), mode)
+
+        # key -> row, least recently used first
+        self.index = OrderedDict()
+        self.row_keys = {}
+        used = np.flatnonzero(self.keys.any(axis=1))
+        for row in used[np.argsort(self.ticks[used], kind="stable")]:
+            key = self.keys[row].tobytes()
+            self.index[key] = int(row)
+            self.row_keys[int(row)] = key
+        used_rows = set(used.tolist())
+        self.free = [r for r in range(capacity - 1, -1, -1) if r not in used_rows]
+        self.tick = int(self.ticks.max()) if len(used) else 0
+
+    def _open(self, name, dtype, shape, mode):
+        path = os.path.join(self.dir, name)
+        if not os.path.exists(path):
+            if mode == "r":
+                raise RuntimeError(f"embedding cache file {path} missing")
+            return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        return np.lib.format.open_memmap(path, mode=mode)
+
+    def refresh(self):
+        """Reader side: index rows the writer filled or reused since the last look."""
+        rows = np.flatnonzero(self.ticks > self.tick)
+        if not len(rows):
+            return
+        # the writer sets a row's tick last, so its key is already in place
+        self.tick = int(self.ticks[rows].max())
+        for row in rows.tolist():
+            key = self.keys[row].tobytes()
+            if not any(key):
+                continue
+            old = self.row_keys.get(row)
+            if old is not None and old != key:
+                self.index.pop(old, None)
+            self.index[key] = row
+            self.row_keys[row] = key
+
+    def get(self, key):
+        row = self.index.get(key)
+        if row is None:
+            return None
+        if self.keys[row].tobytes() != key:
+            return None
+        vec = np.array(self.vectors[row], dtype=np.float32)
+        if self.keys[row].tobytes() != key:
+            return None
+        if self.writable:
+            self.tick += 1
+            self.ticks[row] = self.tick
+            self.index.move_to_end(key)
+        return vec
+
+    def put(self, key, vec):
+        if not self.writable or key in self.index:
+            return
+        if self.free:
+            row = self.free.pop()
+        else:
+            _, row = self.index.popitem(last=False)
+        self.row_keys[row] = key
+        self.keys[row] = 0
+        self.vectors[row] = vec.astype(np.float16)
+        self.keys[row] = np.frombuffer(key, dtype=np.uint8)
+        self.tick += 1
+        self.ticks[row] = self.tick
+        self.index[key] = row
+
+    def encode(self, texts, encode_fn):
+        """
+        Return float32 vectors for texts, calling encode_fn (list -> ndarray)
+        only for texts that are not cached.
+        """
+        keys = [chunk_key(self.model_name, t) for t in texts]
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        missing = {}  # key -> indexes of the texts it stands for
+        with self.lock:
+            for i, key in enumerate(keys):
+                vec = self.get(key)
+                if vec is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    out[i] = vec
+            if missing and not self.writable:
+                self.refresh()
+                for key in list(missing):
+                    vec = self.get(key)
+                    if vec is not None:
+                        out[missing.pop(key)] = vec
+            n_missing = sum(map(len, missing.values()))
+            self.hits += len(texts) - n_missing
+            self.misses += n_missing
+        if missing:
+            # each distinct text is encoded once
+            fresh = encode_fn([texts[idx[0]] for idx in missing.values()])
+            with self.lock:
+                for (key, idx), vec in zip(missing.items(), fresh):
+                    out[idx] = vec
+                    self.put(key, vec)
+        return out
+
+    def flush(self):
+        if self.writable:
+            with self.lock:
+                self.vectors.flush()
+                self.keys.flush()
+                self.ticks.flush()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "rows": len(self.index),
+                "capacity": self.capacity, "writable": self.writable}
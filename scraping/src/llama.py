@@ -1,5 +1,6 @@
-import requests
 import re 
+import json
+from llm_client import get_client
 
 def format_prompt(text):
     print("Starting clean industry extraction…")
@@ -94,16 +95,123 @@ def format_thesis_prompt(industry_area: str, text: str) -> str:
 
 
 
-def call_model(text):
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={
-            "model": "mistral:7b-instruct",
-            "prompt": text,
-            "stream": False
-        }
-    )
-    return response.json()["response"]
+def format_batch_thesis_prompt(industries: list[str], text: str) -> str:
+    """
+    Like format_thesis_prompt, but asks for every industry at once over a
+    shared context and expects a single JSON object back.
+    """
+    industry_lines = "\n    ".join(f"- {ind}" for ind in industries)
+    return f"""
+    You are a **private-equity research assistant**.
+
+    GOAL  
+    For **each** industry listed below, find an **explicit investment thesis**.
+
+    STRICT RULES  
+    1. **Assume there is NO thesis** for an industry unless you find a sentence or
+    phrase that *clearly* states *why* the firm invests in that industry.
+    2. **Verbatim only** – copy the exact words from the text.
+    3. **No guessing, summarising, or re-phrasing.**
+    4. If you do **not** find a thesis for an industry, its value is the empty string `""`.
+
+    OUTPUT FORMAT  
+    A single JSON object and nothing else. One key per industry, spelled exactly
+    as listed; each value is the verbatim thesis or `""`.
+
+    EXAMPLE  
+    {{"Healthcare Services": "We invest in asset-light healthcare businesses with recurring revenue.", "Software": ""}}
+
+    INDUSTRIES  
+    {industry_lines}
+
+    TEXT  
+    {text}
+""".strip()
+
+
+def call_model(text, model=None, stop=None):
+    return get_client().generate(text, model=model, stop=stop)
+
+
+def call_model_many(prompts, model=None, stop=None):
+    """Send several prompts at once; returns responses in prompt order."""
+    return get_client().generate_many(prompts, model=model, stop=stop)
+
+
+# ---- early-stop checks for streamed answers ----
+# Each takes the text generated so far and returns True once the answer the
+# matching parser needs is complete, so the rest of the generation is skipped.
+
+BRACKET_LINE = re.compile(r"^\s*\[[^\[\]\n]+\]\s*$")
+
+
+def _is_empty_answer(partial: str) -> bool:
+    return partial.strip() == '""'
+
+
+def thesis_done(partial: str) -> bool:
+    """format_thesis_prompt answers are one `[...]` line or `""`."""
+    if _is_empty_answer(partial):
+        return True
+    lines = partial.split("\n")[:-1]  # only lines already terminated
+    return any(BRACKET_LINE.match(line) for line in lines)
+
+
+def industries_done(partial: str) -> bool:
+    """format_prompt answers are `[...]` lines; stop at the first prose line after them."""
+    if _is_empty_answer(partial):
+        return True
+    seen_bracket = False
+    for line in partial.split("\n")[:-1]:
+        if BRACKET_LINE.match(line):
+            seen_bracket = True
+        elif line.strip() and seen_bracket:
+            return True
+    return False
+
+
+class JsonObjectEnd:
+    """
+    Finds where the first JSON object in a stream closes. feed() takes each
+    new piece of text and keeps the scan state between calls, so a streamed
+    token costs O(len(token)) rather than a rescan of the whole answer.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_str = self.escaped = self.started = False
+
+    def feed(self, text: str) -> bool:
+        depth, in_str, escaped, started = self.depth, self.in_str, self.escaped, self.started
+        done = False
+        for ch in text:
+            if in_str:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+            elif ch == "{":
+                depth += 1
+                started = True
+            elif ch == "}":
+                depth -= 1
+                if started and depth == 0:
+                    done = True
+                    break
+        self.depth, self.in_str, self.escaped, self.started = depth, in_str, escaped, started
+        return done
+
+
+def batch_theses_done(partial: str) -> bool:
+    """format_batch_thesis_prompt answers end when the JSON object closes."""
+    return JsonObjectEnd().feed(partial)
+
+# LLMClient feeds streamed tokens to one scanner per generation (see _read_stream)
+batch_theses_done.scanner = JsonObjectEnd
 
 def strip_thoughts(text: str) -> str:
     if "</think>" in text:
@@ -159,4 +267,30 @@ def extract_thesis(raw: str) -> str:
     return txt
 
 
-
+def extract_batch_theses(raw: str, industries: list[str]) -> dict[str, str] | None:
+    """
+    Parse a format_batch_thesis_prompt answer into {industry: thesis}.
+    Keys are matched to the requested industries case-insensitively and
+    industries the model left out are omitted. Returns None when no JSON
+    object can be parsed, so the caller can fall back to per-industry calls.
+    """
+    if not raw:
+        return None
+    start, end = raw.find("{"), raw.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(raw[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    wanted = {ind.strip().lower(): ind for ind in industries}
+    theses = {}
+    for key, value in data.items():
+        ind = wanted.get(str(key).strip().lower())
+        if ind is None:
+            continue
+        theses[ind] = extract_thesis(value) if isinstance(value, str) else ""
+    return theses
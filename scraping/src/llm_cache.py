@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".llm_cache.sqlite")
+LLM_CACHE_TTL_DAYS = float(os.environ.get("LLM_CACHE_TTL_DAYS", 0) or 0)  # 0 = never expire
+LLM_CACHE_MAX_ROWS = int(os.environ.get("LLM_CACHE_MAX_ROWS", 100_000))
+EVICT_EVERY = 200  # puts between eviction passes
+
+
+# Bumped when the key changes meaning; v1 keys could hold early-stopped
+# completions under the plain (model, options, prompt) key.
+KEY_VERSION = 2
+
+
+def prompt_key(model, options, prompt, stop=None):
+    raw = json.dumps([KEY_VERSION, model, options or {}, prompt, stop], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def stop_tag(stop):
+    """Cache identity of an early-stop predicate: its module-qualified name."""
+    if stop is None:
+        return None
+    return f"{getattr(stop, '__module__', '')}.{getattr(stop, '__qualname__', repr(stop))}"
+
+
+class LLMCache:
+    """
+    Persistent prompt -> response cache in SQLite, keyed on a hash of
+    (model, options, prompt, stop). A streamed generation cut short by a stop
+    predicate is stored under that predicate's stop_tag, so it is only served
+    to callers using the same predicate, never to full-answer callers. Entries older than the TTL are ignored and
+    purged; past `max_rows` the least recently used entries are dropped.
+    WAL mode lets several worker processes share the file.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl_days=LLM_CACHE_TTL_DAYS, max_rows=LLM_CACHE_MAX_ROWS):
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.puts = 0
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.commit()
+
+    def get(self, model, options, prompt, stop=None):
+        key = prompt_key(model, options, prompt, stop)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, model, options, prompt, response, stop=None):
+        key = prompt_key(model, options, prompt, stop)
+        now = time.time()
+        with self.lock:
+            self.conn.execute("""
+                INSERT INTO responses (key, model, response, created, last_used)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE
+                SET response = excluded.response,
+                    created = excluded.created,
+                    last_used = excluded.last_used
+            """, (key, model, response, now, now))
+            self.conn.commit()
+            self.puts += 1
+            if self.puts % EVICT_EVERY == 0:
+                self._evict_locked(now)
+
+    def evict(self):
+        with self.lock:
+            self._evict_locked(time.time())
+
+    def _evict_locked(self, now):
+        if self.ttl:
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        count = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_rows:
+            self.conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used ASC LIMIT ?
+                )
+            """, (count - self.max_rows,))
+        self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
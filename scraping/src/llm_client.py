@@ -0,0 +1,179 @@
+import asyncio
+import atexit
+import json
+import os
+import threading
+
+import aiohttp
+
+from llm_cache import LLMCache, stop_tag
+
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+LLM_MODEL = os.environ.get("LLM_MODEL", "mistral:7b-instruct")
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", 4))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 300))  # seconds per generation
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", 3))
+LLM_BACKOFF = 1.0  # seconds, doubled per retry
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Persistent prompt/response cache; set LLM_CACHE=0 to always hit the model.
+LLM_CACHE = os.environ.get("LLM_CACHE", "1") != "0"
+# Stream tokens when the caller supplies a stop check; LLM_STREAM=0 disables.
+LLM_STREAM = os.environ.get("LLM_STREAM", "1") != "0"
+
+
+class LLMClient:
+    """
+    Ollama /api/generate client. Requests run on a private event loop thread
+    over one pooled aiohttp session, so any number of sync callers can have
+    generations in flight while at most `concurrency` hit the server at once.
+    Failed requests (connection errors, timeouts, 429/5xx) are retried with
+    exponential backoff. With a cache, responses already seen for the same
+    (model, options, prompt) are returned without calling the server.
+
+    Callers may pass `stop`, a predicate over the text generated so far; the
+    request is then streamed and the connection dropped (which cancels the
+    generation in Ollama) as soon as `stop` returns True. A predicate with a
+    `scanner` attribute is checked incrementally instead: each generation
+    gets `stop.scanner()`, whose feed(token) sees only the new text.
+    """
+
+    def __init__(self, url=OLLAMA_URL, model=LLM_MODEL, concurrency=LLM_CONCURRENCY,
+                 timeout=LLM_TIMEOUT, retries=LLM_RETRIES, backoff=LLM_BACKOFF, options=None,
+                 cache=None):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.options = options or {}
+        self.cache = cache
+        self.session = None
+        self.sem = asyncio.Semaphore(concurrency)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def payload(self, prompt, model=None, options=None, stream=False):
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": stream,
+        }
+        opts = {**self.options, **(options or {})}
+        if opts:
+            payload["options"] = opts
+        return payload
+
+    async def _session(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self.session
+
+    async def agenerate(self, prompt, model=None, options=None, stop=None):
+        stream = bool(stop) and LLM_STREAM
+        payload = self.payload(prompt, model, options, stream=stream)
+        tag = stop_tag(stop) if stream else None
+        if self.cache is not None:
+            # sqlite calls block: keep them off the event loop thread
+            cached = await asyncio.to_thread(self.cache.get, payload["model"], payload.get("options"), prompt, tag)
+            if cached is not None:
+                return cached
+        response = await self._post(payload, stop if stream else None)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, payload["model"], payload.get("options"), prompt, response, tag)
+        return response
+
+    async def _post(self, payload, stop=None):
+        session = await self._session()
+        async with self.sem:
+            for attempt in range(self.retries + 1):
+                try:
+                    async with session.post(f"{self.url}/api/generate", json=payload) as res:
+                        if res.status in RETRY_STATUS:
+                            raise aiohttp.ClientResponseError(
+                                res.request_info, res.history, status=res.status,
+                                message=await res.text())
+                        res.raise_for_status()
+                        if not payload["stream"]:
+                            return (await res.json())["response"]
+                        return await self._read_stream(res, stop)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status = getattr(e, "status", None)
+                    if attempt == self.retries or (status and status not in RETRY_STATUS):
+                        raise
+                    delay = self.backoff * 2 ** attempt
+                    print(f"[LLM] {type(e).__name__} ({status or 'no status'}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+    async def _read_stream(self, res, stop):
+        """Accumulate Ollama's NDJSON chunks until done or `stop` says enough."""
+        parts = []
+        scanner = getattr(stop, "scanner", None)
+        feed = scanner().feed if scanner else None
+        async for line in res.content:
+            if not line.strip():
+                continue
+            msg = json.loads(line)
+            parts.append(msg.get("response", ""))
+            if msg.get("done"):
+                break
+            if feed is not None:
+                if feed(parts[-1]):
+                    break
+            elif stop and stop("".join(parts)):
+                break
+        return "".join(parts)
+
+    def submit(self, prompt, model=None, options=None, stop=None):
+        """Schedule a generation; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(self.agenerate(prompt, model, options, stop), self.loop)
+
+    def generate(self, prompt, model=None, options=None, stop=None):
+        return self.submit(prompt, model, options, stop).result()
+
+    def generate_many(self, prompts, model=None, options=None, stop=None):
+        """Run several prompts concurrently; results come back in prompt order."""
+        futures = [self.submit(p, model, options, stop) for p in prompts]
+        return [f.result() for f in futures]
+
+    def close(self):
+        if not self.loop.is_running():
+            return
+        async def _close():
+            if self.session is not None:
+                await self.session.close()
+        asyncio.run_coroutine_threadsafe(_close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_overrides = {}
+
+
+def configure(**kwargs):
+    """Override LLMClient settings (url, model, concurrency, ...) for this process."""
+    global _client
+    with _client_lock:
+        _overrides.update(kwargs)
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+
+
+def get_client():
+    """Process-wide LLMClient; a forked child builds its own loop and session."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = LLMClient(cache=LLMCache() if LLM_CACHE else None, **_overrides)
+            _client_pid = os.getpid()
+            atexit.register(_client.close)
+        return _client
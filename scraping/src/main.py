@@ -1,14 +1,55 @@
 import os
+import threading
+import time
 import pandas as pd
 from dotenv import load_dotenv
 from concurrent.futures import ProcessPoolExecutor
-from multiprocessing import Manager, Process
+from multiprocessing import Process, Queue
 from llama import *
 from scrape import *
 from sql import *
+from driver_pool import DRIVER_POOL_SIZE, init_pool, get_pool
+import embedder
+import llm_client
+from pipeline_stats import StageStats, StatsMonitor
+from boilerplate import strip_boilerplate
+from checkpoint import FirmProgress
 
 CSV_PATH = 'pefirms.csv'
-OUTPUT_DIR = 'output'
+
+# Scrape processes for main(parallel=True). Each gets an equal share of the
+# DRIVER_POOL_SIZE Chrome budget (at least one), so by default the total
+# number of browsers stays within DRIVER_POOL_SIZE.
+SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", min(os.cpu_count() or 1, DRIVER_POOL_SIZE)))
+
+# Load the embedding model once in a dedicated process shared by the scrape
+# workers and the model worker, instead of once per process. The service
+# batches chunks from all firms in flight (EMBED_MAX_WAIT / EMBED_MAX_BATCH).
+EMBED_SERVICE = os.environ.get("EMBED_SERVICE", "0") == "1"
+
+# Ask for every industry's thesis in one generation, falling back to one call
+# per industry if the JSON answer can't be parsed.
+BATCH_THESIS = os.environ.get("BATCH_THESIS", "1") == "1"
+
+# Remove nav/footer/banner blocks repeated across a firm's pages and
+# near-duplicate chunks before embedding; BOILERPLATE=0 keeps exact dedupe only.
+BOILERPLATE = os.environ.get("BOILERPLATE", "1") == "1"
+
+# Model (LLM) stage: worker processes are spread round-robin over the
+# comma-separated Ollama endpoints. The bounded queue between the stages
+# blocks scrapers when the model workers fall behind.
+MODEL_WORKERS = int(os.environ.get("MODEL_WORKERS", 1))
+OLLAMA_URLS = [u.strip() for u in os.environ.get("OLLAMA_URLS", llm_client.OLLAMA_URL).split(",") if u.strip()]
+MODEL_QUEUE_SIZE = int(os.environ.get("MODEL_QUEUE_SIZE", 100))
+STATS_INTERVAL = float(os.environ.get("STATS_INTERVAL", 60))  # seconds
+
+# Skip firms already saved and resume the others after their last finished
+# stage (firm_progress table + CHECKPOINT_DIR); RESUME=0 reprocesses everything.
+RESUME = os.environ.get("RESUME", "1") == "1"
+
+# Set in each scrape pool process by init_scrape_worker
+_model_queue = None
+_scrape_stats = None
 
 # Load environment and database config
 load_dotenv()
@@ -19,151 +60,214 @@ user = os.environ['PG_USER']
 password = os.environ['PG_PASSWORD']
 
 
+_progress = None
+_progress_pid = None
+
+
+def get_progress():
+    """
+    This process's FirmProgress (None with RESUME=0), over its pooled
+    connections; a forked worker builds its own.
+    """
+    global _progress, _progress_pid
+    if RESUME and (_progress is None or _progress_pid != os.getpid()):
+        _progress = FirmProgress(get_db_pool(host, port, database, user, password))
+        _progress_pid = os.getpid()
+    return _progress
+
+
 def get_firms(path):
     df = pd.read_csv(path)
     return df[(df['country'].str.lower() == 'united states') & (df['website'].notna())].to_dict(orient='records')
 
 
-def process_firm(firm, model_queue):
+def init_scrape_worker(model_queue, stats, drivers):
+    """ProcessPoolExecutor initializer: the queue can only reach workers by inheritance."""
+    global _model_queue, _scrape_stats
+    _model_queue, _scrape_stats = model_queue, stats
+    init_pool(drivers)
+
+
+def process_firm(firm, model_queue=None, stats=None, stage=None):
+    """Crawl and rank one firm, or pick it up after `stage` from its checkpoint."""
+    model_queue = model_queue or _model_queue
+    stats = stats or _scrape_stats
+    progress = get_progress()
     firm_id = str(firm['id'])
     firm_name = firm['name']
     firm_website = 'https://' + firm['website'].strip()
 
     print(f"[{firm_id}] Visiting {firm_website}")
+    started = time.monotonic()
     try:
-        txt_file = crawl_site(firm_website, max_pages=30)
-
-    
-        # 1) Read *all* lines (so blank lines are preserved)
-        # 1) Read all lines, preserving blank ones
-        # 1) Read raw lines (including blank ones and page‐break markers)
-        with open(txt_file, 'r', encoding='utf-8') as f:
-            file_lines = f.read().splitlines()
+        resumed = None
+        if progress and stage in ("ranked", "llm_done"):
+            resumed = progress.load_ranked(firm_id, FirmEmbeddings)
+
+        if resumed is not None:
+            snippets, embeddings = resumed
+            print(f"[{firm_id}] Resuming after stage '{stage}'")
+        else:
+            document = progress.load_document(firm_id) if progress and stage == "crawled" else None
+            if document is None:
+                document = crawl_site(firm_website, max_pages=30)
+                if progress:
+                    progress.save_document(firm_id, document)
+                    progress.mark({firm_id: firm_name}, "crawled")
+            else:
+                print(f"[{firm_id}] Resuming after stage 'crawled'")
 
-        # 2) Chunk on blank lines / headers / page breaks
-        chunks = chunk_text(file_lines)
+            # 1) Chunk on blank lines / headers / page breaks
+            chunks = document.chunks()
 
-        # 3) Deduplicate the resulting chunks (preserving order)
-        seen = set()
-        clean_chunks = []
-        for chunk in chunks:
-            if chunk not in seen:
-                seen.add(chunk)
-                clean_chunks.append(chunk)
+            # 2) Drop cross-page boilerplate and near-duplicate chunks, or just
+            # exact duplicates (preserving order)
+            clean_chunks = strip_boilerplate(document) if BOILERPLATE else dedupe_chunks(chunks)
+            print(f"[{firm_id}] {len(clean_chunks)}/{len(chunks)} chunks kept")
 
-        query = "Industries: Healthcare, Software, Fintech, Retail, Agriculture, Biotech"
+            # 3) Embed every chunk once; the thesis queries reuse these vectors
+            embeddings = FirmEmbeddings.encode(clean_chunks)
 
-        # 4) Score the deduped chunks
-        scored_chunks = embed_and_rank_paragraphs(clean_chunks, query, top_k=30)
+            query = "Industries: Healthcare, Software, Fintech, Retail, Agriculture, Biotech"
 
-        # 4) Write out
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        snippet_path = os.path.join(OUTPUT_DIR, f"{firm_name}_relevant.txt")
-        with open(snippet_path, 'w', encoding='utf-8') as rf:
-            for chunk, score in scored_chunks:
-                rf.write(f"{chunk}\n\n")
+            # 4) Score the deduped chunks
+            scored_chunks = embed_and_rank_paragraphs(clean_chunks, query, top_k=30, embeddings=embeddings)
+            snippets = snippet_lines(scored_chunks)
+            if progress:
+                progress.save_ranked(firm_id, snippets, embeddings)
+                progress.mark({firm_id: firm_name}, "ranked")
 
-        model_queue.put((firm, snippet_path, txt_file))
-        print(f"[{firm_name}] Relevant snippets written to {snippet_path}")
+        # 5) Hand the snippets and chunk vectors to the model stage in memory;
+        # blocks while the model queue is full (back-pressure)
+        done = time.monotonic()
+        model_queue.put((firm, snippets, embeddings))
+        if stats:
+            stats.add(items=1, busy=done - started, blocked=time.monotonic() - done)
+        print(f"[{firm_name}] {len(snippets)} relevant snippet lines queued")
 
     except Exception as e:
+        if stats:
+            stats.add(errors=1, busy=time.monotonic() - started)
         print(f"[{firm_id}] Error in scraping: {e}")
 
 
-def model_worker(model_queue):
-    print("[Model Worker] Started and waiting for queue items.")
-    while True:
-        item = model_queue.get()
-        # Shutdown signal
-        if item is None:
-            print("[Model Worker] Shutdown signal received. Exiting.")
-            break
-
-        firm, path, txt = item
-        firm_name = firm['name']
-        try:
-            text = read_txt(OUTPUT_DIR, f"{firm_name}_relevant.txt")
-            output = ""
-            print(f"Generating output...")
-            draft = call_model(format_prompt(text))
-            
-            output = draft
-            print(f"[{firm_name}] Valid output found.")
+def generate_theses(firm_name, text, embeddings):
+    """LLM stage for one firm: {industry: thesis}."""
+    print(f"Generating output...")
+    draft = call_model(format_prompt(text), stop=industries_done)
 
-            delete_txt(OUTPUT_DIR, f"{firm_name}_relevant.txt")
+    output = draft
+    print(f"[{firm_name}] Valid output found.")
 
-            industries = extract_industries(output)
+    industries = extract_industries(output)
 
-            industries_thesis_map = {}
+    industries_thesis_map = {}
 
-            for idx, ind in enumerate(industries):
-                with open(txt, 'r', encoding='utf-8') as f:
-                    file_lines = f.read().splitlines()
+    # Score every industry's thesis query against the firm's
+    # precomputed chunk vectors in one batch
+    ranked = rank_theses(embeddings, industries, top_k=30)
 
-                chunks = chunk_text(file_lines)
+    if BATCH_THESIS and len(industries) > 1:
+        context = "\n\n".join(union_top_chunks(ranked))
+        batched = extract_batch_theses(
+            call_model(format_batch_thesis_prompt(industries, context),
+                       stop=batch_theses_done), industries)
+        if batched is None:
+            print(f"[{firm_name}] Batched thesis answer unparseable, falling back per industry.")
+        else:
+            industries_thesis_map.update(batched)
 
-                seen = set()
-                clean_chunks = []
-                for chunk in chunks:
-                    if chunk not in seen:
-                        seen.add(chunk)
-                        clean_chunks.append(chunk)
+    remaining = [ind for ind in industries if ind not in industries_thesis_map]
 
-                thesis_query = f"What is the investment thesis for {ind}?"
+    prompts = [format_thesis_prompt(ind, snippet_lines(ranked[ind])) for ind in remaining]
 
-                # 4) Score the deduped chunks
-                scored_chunks = embed_and_rank_paragraphs_thesis(clean_chunks, thesis_query, ind, top_k=30)
+    # All of the firm's thesis prompts are in flight together
+    for ind, thesis_raw in zip(remaining, call_model_many(prompts, stop=thesis_done)):
+        thesis = extract_thesis(thesis_raw)
 
-                # 4) Write out
-                os.makedirs(OUTPUT_DIR, exist_ok=True)
-                snippet_path = os.path.join(OUTPUT_DIR, f"{firm_name}_{idx}_relevant.txt")
-                with open(snippet_path, 'w', encoding='utf-8') as rf:
-                    for chunk, score in scored_chunks:
-                        rf.write(f"{chunk}\n\n")
-                print(f"[{firm_name}] Relevant snippets written to {snippet_path}")
+        industries_thesis_map[ind] = thesis
 
-                text = read_txt(OUTPUT_DIR, f"{firm_name}_{idx}_relevant.txt")
+    return industries_thesis_map
 
-                delete_txt(OUTPUT_DIR, f"{firm_name}_{idx}_relevant.txt")
-
-                thesis_raw = call_model(format_thesis_prompt(ind, text))
-
-                thesis = extract_thesis(thesis_raw)
-
-                industries_thesis_map[ind] = thesis
-
-            delete_txt('', txt)
-
-
-            db = SQLConnection(host, port, database, user, password)
 
+def model_worker(model_queue, endpoint=None, stats=None):
+    if endpoint:
+        llm_client.configure(url=endpoint)
+    embedder.warm_up()
+    # One pooled connection per worker; firm rows are written in batches
+    db = SQLConnection(host, port, database, user, password)
+    progress = get_progress()
+    if progress:
+        # a firm is 'saved' once its rows are committed, not when queued
+        db.writer("firms", merge_firms, key=firm_key, on_flush=lambda firms: progress.mark(
+            {firm[0][-1]: firm[0][0] for firm in firms if firm[0][-1]}, "saved"))
+    print(f"[Model Worker] Started ({endpoint or llm_client.OLLAMA_URL}) and waiting for queue items.")
+    while True:
+        waiting = time.monotonic()
+        item = model_queue.get()
+        started = time.monotonic()
+        if stats:
+            stats.add(idle=started - waiting)
+        # Shutdown signal
+        if item is None:
+            print("[Model Worker] Shutdown signal received. Exiting.")
+            db.close()
+            if get_client().cache is not None:
+                print(f"[Model Worker] LLM cache: {get_client().cache.stats()}")
+            break
 
-            if len(industries_thesis_map) == 0:
-                db.save_firm_to_db(
-                    firm_name, firm['website'], None, None,
-                    firm.get('country', ''), str(firm.get('founded', '')),
-                    firm.get('industry', ''), firm.get('linkedin_url', ''),
-                    firm.get('locality', ''), firm.get('region', ''), firm.get('size', '')
-                )
+        firm, text, embeddings = item
+        firm_id = str(firm['id'])
+        firm_name = firm['name']
+        try:
+            industries_thesis_map = progress.load_theses(firm_id) if progress else None
+            if industries_thesis_map is None:
+                industries_thesis_map = generate_theses(firm_name, text, embeddings)
+                if progress:
+                    progress.save_theses(firm_id, industries_thesis_map)
+                    progress.mark({firm_id: firm_name}, "llm_done")
             else:
-                for ind in industries_thesis_map.keys():
-                    thesis = industries_thesis_map[ind]
-                    db.save_firm_to_db(
-                        firm_name, firm['website'], ind, thesis,
-                        firm.get('country', ''), str(firm.get('founded', '')),
-                        firm.get('industry', ''), firm.get('linkedin_url', ''),
-                        firm.get('locality', ''), firm.get('region', ''), firm.get('size', '')
-                    )
+                print(f"[{firm_name}] Resuming after stage 'llm_done'")
 
-               
+            db.save_firm_to_db(
+                firm_name, firm['website'], industries_thesis_map,
+                firm.get('country', ''), str(firm.get('founded', '')),
+                firm.get('industry', ''), firm.get('linkedin_url', ''),
+                firm.get('locality', ''), firm.get('region', ''), firm.get('size', ''),
+                firm_id=firm_id
+            )
 
-            db.close()
-            print(f"[{firm_name}] Saved to database.")
+            print(f"[{firm_name}] Queued for database.")
+            if stats:
+                stats.add(items=1, busy=time.monotonic() - started)
 
         except Exception as e:
+            if stats:
+                stats.add(errors=1, busy=time.monotonic() - started)
             print(f"[{firm_name}] Error in model processing: {e}")
 
 
+def resume_plan(firms):
+    """
+    Drop firms that are already saved, using two set queries instead of one
+    lookup per firm, and return the remaining firms with {firm_id: stage}
+    for those that stopped part-way.
+    """
+    with SQLConnection(host, port, database, user, password) as db:
+        db.create_table()  # firm_id column, indexes and firm_progress, if missing
+        saved_ids, legacy_names = db.saved_firms()
+        stages = FirmProgress(db.pool).load()
+    # the scrape and model workers are forked next: don't leave them our sockets
+    close_db_pool(host, port, database, user, password)
+    pending = [firm for firm in firms
+               if stages.get(str(firm['id'])) != "saved" and str(firm['id']) not in saved_ids
+               and firm['name'] not in legacy_names]
+    resuming = sum(1 for firm in pending if str(firm['id']) in stages)
+    print(f"[resume] {len(firms) - len(pending)} firms already saved, "
+          f"{resuming} resuming part-way, {len(pending) - resuming} new")
+    return pending, stages
+
+
 def main(parallel: bool = False):    
 
     # db = SQLConnection(host, port, database, user, password)
@@ -172,37 +276,57 @@ def main(parallel: bool = False):
     # db.close()
 
     firms = get_firms(CSV_PATH)
-
-    # Use a Manager queue for inter-process communication
-    with Manager() as manager:
-        model_queue = manager.Queue(maxsize=100)
-
-        # Start model worker process
-        model_proc = Process(target=model_worker, args=(model_queue,))
-        model_proc.start()
-
+    stages = {}
+    if RESUME:
+        firms, stages = resume_plan(firms)
+
+    if EMBED_SERVICE:
+        embedder.start_service(os.environ.get("EMBED_SERVICE_ADDR", "127.0.0.1:6010"))
+
+    # A plain multiprocessing queue (pipe-based) between scrape and model
+    # stages; bounded so scraping can't run arbitrarily far ahead of the LLM.
+    model_queue = Queue(maxsize=MODEL_QUEUE_SIZE)
+    scrape_workers = SCRAPE_WORKERS if parallel else 1
+    scrape_stats = StageStats("scrape", workers=scrape_workers)
+    model_stats = StageStats("model", workers=MODEL_WORKERS)
+
+    # Start model worker processes
+    model_procs = [
+        Process(target=model_worker, name=f"model-worker-{i}",
+                args=(model_queue, OLLAMA_URLS[i % len(OLLAMA_URLS)], model_stats))
+        for i in range(MODEL_WORKERS)
+    ]
+    for proc in model_procs:
+        proc.start()
+
+    monitor = StatsMonitor(model_queue, [scrape_stats, model_stats],
+                           interval=STATS_INTERVAL, maxsize=MODEL_QUEUE_SIZE).start()
+    try:
         # Scrape firms in parallel
-        if parallel:                          # old behaviour
-           with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
-            for firm in firms:
-                executor.submit(process_firm, firm, model_queue)
+        if parallel:
+            per_worker = max(1, DRIVER_POOL_SIZE // SCRAPE_WORKERS)
+            # Only keep a couple of firms per worker submitted at a time
+            in_flight = threading.BoundedSemaphore(SCRAPE_WORKERS * 2)
+            with ProcessPoolExecutor(max_workers=SCRAPE_WORKERS, initializer=init_scrape_worker,
+                                     initargs=(model_queue, scrape_stats, per_worker)) as executor:
+                for firm in firms:
+                    in_flight.acquire()
+                    future = executor.submit(process_firm, firm, None, None, stages.get(str(firm['id'])))
+                    future.add_done_callback(lambda _: in_flight.release())
         else:                                 # single-process scrape
+            if CRAWL_ENGINE == "selenium":
+                get_pool().warm()
             for firm in firms:
-                db = SQLConnection(host, port, database, user, password)
-                result = db.cursor.execute(
-                "SELECT 1 FROM firms WHERE name = %s LIMIT 1",
-                (firm['name'],))
-                row = db.cursor.fetchone()
-                db.close()
-                if row:
-                    print(f'Skipping {firm['name']}... already exists')
-                    continue
-                else:
-                    process_firm(firm, model_queue)
-
-        # Signal the worker to shut down
-        model_queue.put(None)
-        model_proc.join()
+                process_firm(firm, model_queue, scrape_stats, stages.get(str(firm['id'])))
+    finally:
+        # Signal each model worker to shut down once the queue drains
+        for _ in model_procs:
+            model_queue.put(None)
+        for proc in model_procs:
+            proc.join()
+        monitor.stop()
+        if EMBED_SERVICE:
+            print(f"[Embedding Service] {embedder.service_stats()}")
 
 
 if __name__ == '__main__':
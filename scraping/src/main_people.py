@@ -1,6 +1,7 @@
 # main_people.py
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
 
 from dotenv import load_dotenv
@@ -8,12 +9,17 @@ from people_scrape import LeadershipCrawler  # your existing crawler
 from sql import SQLConnection          # <-- change to your actual module name
 import pandas as pd
 from urllib.parse import urlparse
-import requests
-import csv
+from unreachable import get_registry
+from reachability import check_host
 
 
 UNREACHABLE_CSV='unreachable_people_links.csv'
 
+# Firms crawled at once, and pages fetched at once per firm (1 = sequential).
+# Per-domain politeness limits live in people_scrape.
+PEOPLE_FIRM_WORKERS = int(os.environ.get("PEOPLE_FIRM_WORKERS", 4))
+PEOPLE_CRAWL_WORKERS = int(os.environ.get("PEOPLE_CRAWL_WORKERS", 4))
+
 # =======================
 # Faith keyword detection
 # =======================
@@ -30,21 +36,30 @@ FAITH_REGEX = re.compile(r"(" + "|".join(FAITH_KEYWORDS) + r")", re.IGNORECASE)
 
 SENTENCE_SPLIT_REGEX = re.compile(r'(?<=[.!?])\s+')
 
-def compute_faith_score(text: str):
+def compute_faith_score(text: str, scan: Optional[Tuple[Optional[str], List[int]]] = None):
     if not text:
         return 0, ""
+    if scan is None:
+        scan = scan_bio(text)
+    if not scan[1]:
+        return 0, ""
 
-    # Find all sentences
-    sentences = SENTENCE_SPLIT_REGEX.split(text)
+    # Collect the sentences holding a keyword match. Keywords never span a
+    # sentence break, so this is the same as searching each sentence.
+    matches = []
+    hits = iter(scan[1])
+    hit = next(hits)
+    start = 0
+    for sep in [*SENTENCE_SPLIT_REGEX.finditer(text), None]:
+        end = sep.start() if sep else len(text)
+        if hit is not None and hit < end:
+            matches.append(text[start:end].strip())
+            while hit is not None and hit < end:
+                hit = next(hits, None)
+        start = sep.end() if sep else end
 
-    # Check for keyword matches and collect matching sentences
-    matches = [s.strip() for s in sentences if FAITH_REGEX.search(s)]
-    
-    if matches:
-        evidence = " ".join(matches)
-        return 1, evidence
-    else:
-        return 0, ""
+    evidence = " ".join(matches)
+    return 1, evidence
 
 
 # =======================
@@ -124,22 +139,62 @@ TITLE_PATTERNS: List[Tuple[str, re.Pattern]] = [
     for canon, syns in TITLE_SYNONYMS.items()
 ]
 
+# Every title synonym and faith keyword in one regex, run once per lowercased
+# bio. Matches are zero-width lookaheads, so every position is tried and
+# overlapping mentions are all seen: titles at word starts, most senior
+# first (only the first alternative that matches at a position is reported),
+# faith keywords anywhere. No title synonym and faith keyword can match at
+# the same position. Each alternative ends in an empty named group, which
+# names it while keeping its first character a literal so the regex engine
+# skips non-starters cheaply.
+def _build_bio_pattern() -> Tuple[re.Pattern, Dict[str, Tuple[int, Optional[str]]]]:
+    groups: Dict[str, Tuple[int, Optional[str]]] = {}  # group -> (seniority order, canon); faith -> (-1, None)
+    titles, faith = [], []
+    # stable sort: equal ranks keep TITLE_SYNONYMS order, as min() over it did
+    for order, canon in enumerate(sorted(TITLE_SYNONYMS, key=lambda c: SENIORITY_RANK_HIGH.get(c, 9999))):
+        for i, syn in enumerate(TITLE_SYNONYMS[canon]):
+            group = f"{canon.replace(' ', '_')}_{i}"
+            groups[group] = (order, canon)
+            # every synonym starts with \b, which the pattern applies once up front
+            titles.append(syn.removeprefix(r"\b") + f"(?P<{group}>)")
+    for i, kw in enumerate(FAITH_KEYWORDS):
+        groups[f"faith_{i}"] = (-1, None)
+        faith.append(f"{kw}(?P<faith_{i}>)")
+    pattern = re.compile(r"\b(?=(?:" + "|".join(titles) + r"))|(?=(?:" + "|".join(faith) + r"))")
+    return pattern, groups
+
+BIO_PATTERN, _BIO_GROUPS = _build_bio_pattern()
+
+def scan_bio(text: str) -> Tuple[Optional[str], List[int]]:
+    """
+    One pass over a bio: (highest-seniority canonical title in it, offsets
+    of its faith keyword matches).
+    """
+    best = None
+    faith = []
+    lowered = text.lower()
+    for m in BIO_PATTERN.finditer(lowered):
+        order, canon = _BIO_GROUPS[m.lastgroup]
+        if canon is None:
+            faith.append(m.start())
+        elif best is None or order < best[0]:
+            best = (order, canon)
+    if faith and len(lowered) != len(text):
+        # lowercasing changed some character's length: offsets are off
+        faith = [m.start() for m in FAITH_REGEX.finditer(text)]
+    return (best[1] if best else None), faith
+
 def extract_best_position_from_text(text: str) -> Optional[str]:
     """Return the highest-seniority canonical title mentioned in text."""
     if not text:
         return None
-    found: List[str] = []
-    for canon, pat in TITLE_PATTERNS:
-        if pat.search(text):
-            found.append(canon)
-    if not found:
-        return None
-    return min(found, key=lambda c: SENIORITY_RANK_HIGH.get(c, 9999))
+    return scan_bio(text)[0]
 
-def choose_best_position(heading_pos: str, bio_text: str) -> str:
+def choose_best_position(heading_pos: str, bio_text: str,
+                         scan: Optional[Tuple[Optional[str], List[int]]] = None) -> str:
     """Pick highest rank across heading-adjacent title and any titles found in the bio."""
     heading_pos = (heading_pos or "").strip()
-    bio_pos = extract_best_position_from_text(bio_text or "")
+    bio_pos = scan[0] if scan is not None else extract_best_position_from_text(bio_text or "")
     if not heading_pos and not bio_pos:
         return ""
     if heading_pos and not bio_pos:
@@ -163,70 +218,14 @@ def normalize_url(url: str) -> str:
 
 def is_reachable(test_url: str, csv_path: str = UNREACHABLE_CSV) -> bool:
     """
-    Checks if test_url is reachable quickly (HEAD -> tiny GET fallback).
-    If unreachable, logs (url, reason) to csv_path.
+    Checks if test_url's host is reachable (HEAD -> tiny GET fallback, cached
+    per host). If unreachable, logs (url, reason) to csv_path.
     """
-    s = requests.Session()
-    timeout = (2, 4)  # connect/read timeout
+    status = check_host(test_url)
+    if not status.reachable:
+        get_registry(csv_path).add(test_url, status.reason)
+    return status.reachable
 
-    try:
-        # Try HEAD request first
-        r = s.head(test_url, timeout=timeout, allow_redirects=True)
-        if r.status_code in (405, 400) or ("HEAD" not in r.headers.get("Allow", "") and r.status_code >= 400):
-            # Fallback: tiny GET
-            g = s.get(test_url, headers={"Range": "bytes=0-0"}, timeout=timeout, allow_redirects=True, stream=True)
-            g.close()
-            if 200 <= g.status_code < 400:
-                return True
-            _write_unreachable(csv_path, test_url, f"GET {g.status_code}")
-            return False
-
-        if 200 <= r.status_code < 400:
-            return True
-
-        _write_unreachable(csv_path, test_url, f"HEAD {r.status_code}")
-        return False
-
-    except requests.exceptions.SSLError:
-        # Retry with http:// if SSL fails
-        try:
-            http_url = "http://" + test_url.split("://", 1)[-1]
-            r2 = s.head(http_url, timeout=timeout, allow_redirects=True)
-            if r2.status_code in (405, 400) or ("HEAD" not in r2.headers.get("Allow", "") and r2.status_code >= 400):
-                g2 = s.get(http_url, headers={"Range": "bytes=0-0"}, timeout=timeout, allow_redirects=True, stream=True)
-                g2.close()
-                if 200 <= g2.status_code < 400:
-                    return True
-                _write_unreachable(csv_path, test_url, f"HTTP GET {g2.status_code}")
-                return False
-            if 200 <= r2.status_code < 400:
-                return True
-            _write_unreachable(csv_path, test_url, f"HTTP HEAD {r2.status_code}")
-            return False
-        except Exception as e2:
-            _write_unreachable(csv_path, test_url, f"http-retry-failed: {type(e2).__name__}")
-            return False
-
-    except (requests.exceptions.ConnectTimeout,
-            requests.exceptions.ReadTimeout,
-            requests.exceptions.ConnectionError) as e:
-        _write_unreachable(csv_path, test_url, type(e).__name__)
-        return False
-
-    except requests.exceptions.RequestException as e:
-        _write_unreachable(csv_path, test_url, f"req-exc:{type(e).__name__}")
-        return False
-
-
-def _write_unreachable(csv_path: str, url: str, reason: str) -> None:
-    """Append (url, reason) to CSV; create with header if missing."""
-    exists = os.path.exists(csv_path)
-    with open(csv_path, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if not exists:
-            w.writerow(["url", "reason"])
-        w.writerow([url, reason])
-    
 
 # =======================
 # Pipeline to your DB
@@ -242,27 +241,18 @@ def run_people_pipeline_to_db(firm: dict, db_conn) -> None:
     firm_website = normalize_url(raw_site)
 
    
-    unreachable_set = set()
-    if os.path.exists(UNREACHABLE_CSV):
-        with open(UNREACHABLE_CSV, "r", encoding="utf-8", newline="") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if not row:
-                    continue
-                val = row[0].strip()
-                if val.lower() != "url" and val:
-                    unreachable_set.add(val)
-
-
-    if firm_website in unreachable_set:
+    unreachable = get_registry(UNREACHABLE_CSV)
+    if firm_website in unreachable:
         print(f"[skip] Already in unreachable.csv: {firm_website}")
         return
 
     if not is_reachable(firm_website):
+        unreachable.flush()
         print(f'Skipping {firm_website}... not reachable')
         return
 
-    crawler = LeadershipCrawler(firm_website, max_pages=200, max_depth=3, verbose=True)
+    crawler = LeadershipCrawler(firm_website, max_pages=200, max_depth=3, verbose=True,
+                                workers=PEOPLE_CRAWL_WORKERS)
     bios = crawler.crawl()
     
 
@@ -274,8 +264,9 @@ def run_people_pipeline_to_db(firm: dict, db_conn) -> None:
 
         bio = rec.get("bio", "") or ""
         heading_pos = rec.get("position") or ""
-        best_pos = choose_best_position(heading_pos, bio)
-        faith, evidence = compute_faith_score(bio)
+        scan = scan_bio(bio)
+        best_pos = choose_best_position(heading_pos, bio, scan)
+        faith, evidence = compute_faith_score(bio, scan)
         firm_name = firm.get('name', '')
         region =  firm.get('region', '')
 
@@ -317,8 +308,13 @@ if __name__ == "__main__":
     db.create_people_table()
 
     firms = get_firms(CSV_PATH)
-    for firm in firms:
-        
-        run_people_pipeline_to_db(firm, db)
+    try:
+        # the people writer batches rows from every firm thread
+        with ThreadPoolExecutor(max_workers=PEOPLE_FIRM_WORKERS) as pool:
+            for _ in pool.map(lambda firm: run_people_pipeline_to_db(firm, db), firms):
+                pass
+    finally:
+        # write out the last batch of people
+        db.close()
       
 
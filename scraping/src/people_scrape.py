@@ -2,9 +2,13 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+from bs4.element import CData, NavigableString, Tag
+from bisect import bisect_right
 from urllib.parse import urljoin, urlparse, urlunparse
 from collections import deque
-import csv, json, re, sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import csv, json, os, re, sys, threading, time
 from typing import List, Dict, Tuple, Set, Optional
 
 LEADERSHIP_KEYWORDS = [
@@ -43,11 +47,26 @@ EXCLUDE_NAME_PREFIXES = {
     'Home', 'News', 'Press', 'Media', 'Blog', 'Article', 'Case', 'FAQ', 'Helpdesk', 'Portal',
     'Dashboard', 'Account', 'Login', 'Register'
 }
+# Lowercased once: a heading is not a name if any of these occurs anywhere in it.
+EXCLUDE_NAME_PATTERN = re.compile('|'.join(sorted(re.escape(ex.lower()) for ex in EXCLUDE_NAME_PREFIXES)))
+ROLE_WORDS = ['partner','principal','associate','manager','managing','director','vp','vice','president',
+              'analyst','founder','co-founder','chief','officer','cto','ceo','cfo','coo','chair']
+ROLE_WORDS_PATTERN = re.compile('|'.join(map(re.escape, ROLE_WORDS)))
 CONTAINER_KEYWORDS = ['profile','team-member','member','bio','leadership','person','staff','employee']
+CONTAINER_TAGS = {'div', 'section', 'article'}
+HEADING_LEVELS = {'h1': 0, 'h2': 1, 'h3': 2, 'h4': 3}
 TITLE_HINTS = ['title','role','position','job','designation']
+TITLE_HINT_PATTERNS = [re.compile(kw, re.I) for kw in TITLE_HINTS]
+# "single" (one walk per page, default) or "tree" (find/get_text per container)
+PROFILE_EXTRACTOR = os.environ.get("PROFILE_EXTRACTOR", "single")
 MIN_BIO_LENGTH = 50
 REQUEST_TIMEOUT = 8
 HEADERS = {"User-Agent": "Mozilla/5.0 (bio-scraper/1.1)"}
+# Politeness for concurrent crawls, shared by every crawler in the process:
+# at most PER_DOMAIN_CONCURRENCY requests in flight per domain, and request
+# starts at least CRAWL_DELAY seconds apart.
+PER_DOMAIN_CONCURRENCY = int(os.environ.get("PEOPLE_PER_DOMAIN", 4))
+CRAWL_DELAY = float(os.environ.get("PEOPLE_CRAWL_DELAY", 0))
 SKIP_EXTS = {'.pdf','.jpg','.jpeg','.png','.gif','.svg','.webp','.mp4','.mov','.zip','.doc','.docx','.xls','.xlsx'}
 
 def _norm(url: str) -> str:
@@ -62,17 +81,133 @@ def _looks_like_leadership_path(path: str) -> bool:
     p = path.lower()
     return any(k in p for k in LEADERSHIP_KEYWORDS)
 
+def _is_excluded_name(name: str) -> bool:
+    return EXCLUDE_NAME_PATTERN.search(name.lower()) is not None
+
 def _anchor_text_says_team(a: str) -> bool:
     t = (a or "").strip().lower()
     return any(k in t for k in ['team','leadership','people','about','partners','management'])
 
+# string types get_text() returns for ordinary tags (not script/style/template/ruby text)
+_TEXT_TYPES = (NavigableString, CData)
+
+
+class PageIndex:
+    """
+    One iterative walk over a parsed page. Every tag gets its pre-order
+    position and the span of stripped strings beneath it, so a subtree's
+    get_text(" ", strip=True) is a join over a slice instead of another
+    walk; div/section/article tags also get the first h1..h4 beneath them.
+    Containers are listed in post-order (inner before outer).
+    """
+
+    def __init__(self, soup: BeautifulSoup):
+        self.tags: List[Tag] = []                   # pre-order
+        self.pos: Dict[int, int] = {}               # id(tag) -> index in self.tags
+        self.end: Dict[int, int] = {}               # id(tag) -> index past its last descendant
+        self.span: Dict[int, Tuple[int, int]] = {}  # id(tag) -> slice of self.strings
+        self.strings: List[str] = []
+        self.paragraphs: List[int] = []             # pre-order indexes of <p>
+        self.headings: Dict[int, List[Optional[Tag]]] = {}
+        self.containers: List[Tag] = []
+        self.keyword_containers: List[Tag] = []
+
+        stack = [(soup, iter(soup.contents), 0, [None] * 4)]
+        while stack:
+            tag, children, start, heads = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                self.span[id(tag)] = (start, len(self.strings))
+                self.end[id(tag)] = len(self.tags)
+                if tag.name in CONTAINER_TAGS:
+                    self.headings[id(tag)] = heads
+                    self.containers.append(tag)
+                    if any(kw in ' '.join(tag.get('class', [])).lower() for kw in CONTAINER_KEYWORDS):
+                        self.keyword_containers.append(tag)
+                if stack:
+                    parent = stack[-1][3]
+                    for i, h in enumerate(heads):
+                        if parent[i] is None:
+                            parent[i] = h
+            elif isinstance(child, Tag):
+                self.pos[id(child)] = len(self.tags)
+                self.tags.append(child)
+                if child.name == 'p':
+                    self.paragraphs.append(self.pos[id(child)])
+                child_heads = [None] * 4
+                level = HEADING_LEVELS.get(child.name)
+                if level is not None:
+                    child_heads[level] = child
+                stack.append((child, iter(child.contents), len(self.strings), child_heads))
+            elif type(child) in _TEXT_TYPES:
+                text = child.strip()
+                if text:
+                    self.strings.append(text)
+
+    def text(self, tag: Tag) -> str:
+        start, end = self.span[id(tag)]
+        return " ".join(self.strings[start:end])
+
+    def heading(self, container: Tag) -> Optional[Tag]:
+        """What container.find('h1') or ... find('h4') would return."""
+        return next((h for h in self.headings[id(container)] if h is not None), None)
+
+    def tags_after(self, tag: Tag, limit: int) -> List[Tag]:
+        """tag.find_all_next(limit=limit)"""
+        i = self.pos[id(tag)] + 1
+        return self.tags[i:i + limit]
+
+    def descendants(self, tag: Tag) -> List[Tag]:
+        return self.tags[self.pos[id(tag)] + 1:self.end[id(tag)]]
+
+    def next_paragraph(self, tag: Tag) -> Optional[Tag]:
+        """tag.find_next('p')"""
+        i = bisect_right(self.paragraphs, self.pos[id(tag)])
+        return self.tags[self.paragraphs[i]] if i < len(self.paragraphs) else None
+
+
+class DomainLimiter:
+    def __init__(self, per_domain: int = PER_DOMAIN_CONCURRENCY, delay: float = CRAWL_DELAY):
+        self.per_domain = per_domain
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.slots: Dict[str, threading.BoundedSemaphore] = {}
+        self.next_start: Dict[str, float] = {}
+
+    @contextmanager
+    def slot(self, domain: str):
+        with self.lock:
+            sem = self.slots.setdefault(domain, threading.BoundedSemaphore(self.per_domain))
+        with sem:
+            if self.delay:
+                with self.lock:
+                    now = time.monotonic()
+                    start = max(now, self.next_start.get(domain, 0.0))
+                    self.next_start[domain] = start + self.delay
+                time.sleep(start - now)
+            yield
+
+
+_limiter = DomainLimiter()
+
+
 class LeadershipCrawler:
-    def __init__(self, start_url: str, max_pages: int = 300, max_depth: int = 3, verbose: bool = True):
+    """
+    BFS over a firm's leadership-looking pages. With workers > 1 each depth
+    level of the frontier is fetched concurrently (within the per-domain
+    limits) and processed in frontier order, so the pages visited and the
+    records found, in order, are the same as with the sequential crawl.
+    """
+
+    def __init__(self, start_url: str, max_pages: int = 300, max_depth: int = 3, verbose: bool = True,
+                 workers: int = 1):
         self.start_url = start_url.rstrip("/")
         self.domain = urlparse(self.start_url).netloc
         self.max_pages = max_pages
         self.max_depth = max_depth
         self.verbose = verbose
+        self.workers = workers
         self.visited: Set[str] = set()
         self.seen: Set[Tuple[str, str]] = set()  # (name, page_url)
         self.results: List[Dict[str, str]] = []
@@ -80,10 +215,13 @@ class LeadershipCrawler:
         # session with retries
         self.sess = requests.Session()
         retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
-        self.sess.mount("http://", HTTPAdapter(max_retries=retries))
-        self.sess.mount("https://", HTTPAdapter(max_retries=retries))
+        pool_size = max(10, workers)
+        self.sess.mount("http://", HTTPAdapter(max_retries=retries, pool_maxsize=pool_size))
+        self.sess.mount("https://", HTTPAdapter(max_retries=retries, pool_maxsize=pool_size))
 
     def crawl(self) -> List[Dict[str, str]]:
+        if self.workers > 1:
+            return self._crawl_levels()
         q = deque([(self.start_url, 0)])
         while q and len(self.visited) < self.max_pages:
             url, depth = q.popleft()
@@ -94,44 +232,83 @@ class LeadershipCrawler:
             if self.verbose:
                 print(f"[{len(self.visited)}/{self.max_pages}] depth={depth} → {url}")
 
-            try:
-                res = self.sess.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-                ctype = res.headers.get('Content-Type', '')
-                if res.status_code != 200 or 'text/html' not in ctype:
-                    if self.verbose:
-                        print(f"  skip: status={res.status_code}, type={ctype}")
-                    continue
-                soup = BeautifulSoup(res.text, 'html.parser')
-            except Exception as e:
-                if self.verbose:
-                    print(f"  fail: {e}")
-                continue
+            soup = self._fetch_logged(url, self._fetch(url))
+            if soup is not None:
+                q.extend(self._process(soup, url, depth))
+        return self.results
 
-            # Only parse leadership-like pages
-            if _looks_like_leadership_path(urlparse(url).path):
-                for rec in self._extract_profiles(soup, source_url=url):
-                    key = (rec["name"], rec["source_url"])
-                    if key in self.seen:
-                        continue
-                    self.seen.add(key)
-                    self.results.append(rec)
-
-            # Enqueue next links — but restrict aggressively
-            if depth < self.max_depth:
-                for a in soup.find_all('a', href=True):
-                    abs_url = urljoin(url, a['href'])
-                    if urlparse(abs_url).netloc != self.domain:
+    def _crawl_levels(self) -> List[Dict[str, str]]:
+        level = [(self.start_url, 0)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while level and len(self.visited) < self.max_pages:
+                # same pop order and max_pages cut-off as the sequential queue
+                batch = []
+                for url, depth in level:
+                    if len(self.visited) >= self.max_pages:
+                        break
+                    url = _norm(url)
+                    if not url or url in self.visited:
                         continue
-                    # Only enqueue if the link *looks* like a leadership page OR anchor text suggests it
-                    u_norm = _norm(abs_url)
-                    if not u_norm:
-                        continue
-                    path = urlparse(u_norm).path
-                    if _looks_like_leadership_path(path) or _anchor_text_says_team(a.get_text()):
-                        if u_norm not in self.visited:
-                            q.append((u_norm, depth + 1))
+                    self.visited.add(url)
+                    if self.verbose:
+                        print(f"[{len(self.visited)}/{self.max_pages}] depth={depth} → {url}")
+                    batch.append((url, depth))
+
+                next_level = []
+                fetched = pool.map(self._fetch, [url for url, _ in batch])
+                for (url, depth), result in zip(batch, fetched):
+                    soup = self._fetch_logged(url, result)
+                    if soup is not None:
+                        next_level.extend(self._process(soup, url, depth))
+                level = next_level
         return self.results
 
+    def _fetch(self, url: str) -> Tuple[Optional[BeautifulSoup], str]:
+        """GET and parse one page: (soup, "") or (None, reason it was skipped)."""
+        try:
+            with _limiter.slot(self.domain):
+                res = self.sess.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+            ctype = res.headers.get('Content-Type', '')
+            if res.status_code != 200 or 'text/html' not in ctype:
+                return None, f"  skip: status={res.status_code}, type={ctype}"
+            return BeautifulSoup(res.text, 'html.parser'), ""
+        except Exception as e:
+            return None, f"  fail: {e}"
+
+    def _fetch_logged(self, url: str, result: Tuple[Optional[BeautifulSoup], str]) -> Optional[BeautifulSoup]:
+        soup, reason = result
+        if soup is None and self.verbose:
+            print(reason)
+        return soup
+
+    def _process(self, soup: BeautifulSoup, url: str, depth: int) -> List[Tuple[str, int]]:
+        """Collect the page's profiles; return the links to visit next."""
+        # Only parse leadership-like pages
+        if _looks_like_leadership_path(urlparse(url).path):
+            for rec in self._extract_profiles(soup, source_url=url):
+                key = (rec["name"], rec["source_url"])
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+                self.results.append(rec)
+
+        # Enqueue next links — but restrict aggressively
+        links = []
+        if depth < self.max_depth:
+            for a in soup.find_all('a', href=True):
+                abs_url = urljoin(url, a['href'])
+                if urlparse(abs_url).netloc != self.domain:
+                    continue
+                # Only enqueue if the link *looks* like a leadership page OR anchor text suggests it
+                u_norm = _norm(abs_url)
+                if not u_norm:
+                    continue
+                path = urlparse(u_norm).path
+                if _looks_like_leadership_path(path) or _anchor_text_says_team(a.get_text()):
+                    if u_norm not in self.visited:
+                        links.append((u_norm, depth + 1))
+        return links
+
     def save_csv(self, filepath: str) -> None:
         fieldnames = ["name", "position", "bio", "source_url"]
         with open(filepath, "w", newline="", encoding="utf-8") as f:
@@ -147,6 +324,92 @@ class LeadershipCrawler:
 
     # -------- extraction helpers --------
     def _extract_profiles(self, soup: BeautifulSoup, source_url: str) -> List[Dict[str, str]]:
+        if PROFILE_EXTRACTOR == "tree":
+            return self._extract_profiles_tree(soup, source_url)
+        return self._extract_profiles_single_pass(soup, source_url)
+
+    def _extract_profiles_single_pass(self, soup: BeautifulSoup, source_url: str) -> List[Dict[str, str]]:
+        """
+        Same candidates and record rules as _extract_profiles_tree, over one
+        PageIndex walk. Containers are tried inner to outer and each heading
+        yields at most one record, from the innermost container that makes a
+        valid profile; outer wrappers whose first heading is already taken
+        (the page, a grid of cards) are skipped before any text is built.
+        Records come out in the containers' document order.
+        """
+        page = PageIndex(soup)
+        taken = set()
+        found = []
+        for c in page.keyword_containers or page.containers:
+            heading = page.heading(c)
+            if heading is None or id(heading) in taken:
+                continue
+
+            name = page.text(heading)
+            if not name or _is_excluded_name(name) or not NAME_PATTERN.match(name):
+                continue
+
+            position = self._title_nearby_indexed(page, heading) or self._title_by_class_indexed(page, c)
+
+            full_text = page.text(c)
+            bio_text = full_text
+            if full_text.startswith(name):
+                bio_text = full_text[len(name):].strip()
+            if position and bio_text.startswith(position):
+                bio_text = bio_text[len(position):].strip()
+
+            if len(bio_text) < MIN_BIO_LENGTH:
+                alt_bio = self._paragraphs_after_indexed(page, heading, limit_chars=800)
+                if not alt_bio or len(alt_bio) < MIN_BIO_LENGTH:
+                    continue
+                bio_text = alt_bio
+
+            taken.add(id(heading))
+            found.append((page.pos[id(c)], {
+                "name": name,
+                "position": position or "",
+                "bio": self._clean_spaces(bio_text),
+                "source_url": source_url
+            }))
+        records = [rec for _, rec in sorted(found, key=lambda item: item[0])]
+        if self.verbose:
+            print(f"  extracted {len(records)} profiles from {source_url}")
+        return records
+
+    def _title_nearby_indexed(self, page: PageIndex, heading: Tag) -> Optional[str]:
+        for sib in page.tags_after(heading, 4):
+            if sib.name in ['h5','h6','p','span','small','div']:
+                text = page.text(sib)
+                if self._looks_like_title(text):
+                    return text
+        return None
+
+    def _title_by_class_indexed(self, page: PageIndex, container: Tag) -> Optional[str]:
+        tags = page.descendants(container)
+        for pattern in TITLE_HINT_PATTERNS:
+            for el in tags:
+                classes = el.get('class')
+                if not classes:
+                    continue
+                # bs4 matches each class value, then the whole attribute
+                if any(pattern.search(c) for c in classes) or pattern.search(' '.join(classes)):
+                    txt = page.text(el)
+                    if self._looks_like_title(txt):
+                        return txt
+                    break
+        return None
+
+    def _paragraphs_after_indexed(self, page: PageIndex, heading: Tag, limit_chars: int = 600) -> str:
+        texts = []
+        p = page.next_paragraph(heading)
+        while p and sum(len(x) for x in texts) < limit_chars:
+            txt = page.text(p)
+            if txt:
+                texts.append(txt)
+            p = p.find_next_sibling('p')
+        return " ".join(texts).strip()
+
+    def _extract_profiles_tree(self, soup: BeautifulSoup, source_url: str) -> List[Dict[str, str]]:
         records: List[Dict[str, str]] = []
         containers = soup.find_all(
             lambda tag: tag.name in ['div', 'section', 'article']
@@ -164,7 +427,7 @@ class LeadershipCrawler:
                 continue
 
             name = heading.get_text(" ", strip=True)
-            if not name or any(ex.lower() in name.lower() for ex in EXCLUDE_NAME_PREFIXES) or not NAME_PATTERN.match(name):
+            if not name or _is_excluded_name(name) or not NAME_PATTERN.match(name):
                 continue
 
 
@@ -213,10 +476,7 @@ class LeadershipCrawler:
     def _looks_like_title(self, text: str) -> bool:
         if not text or len(text) > 80:
             return False
-        role_words = ['partner','principal','associate','manager','managing','director','vp','vice','president',
-                      'analyst','founder','co-founder','chief','officer','cto','ceo','cfo','coo','chair']
-        t = text.lower()
-        return any(w in t for w in role_words) or ("," in text and len(text) <= 60)
+        return ROLE_WORDS_PATTERN.search(text.lower()) is not None or ("," in text and len(text) <= 60)
 
     def _paragraphs_after(self, heading, limit_chars: int = 600) -> str:
         texts = []
@@ -234,13 +494,14 @@ class LeadershipCrawler:
 
 if __name__ == '__main__':
     if len(sys.argv) < 3:
-        print("Usage: python leadership_crawler.py <start_url> <output.csv>")
+        print("Usage: python leadership_crawler.py <start_url> <output.csv> [workers]")
         sys.exit(1)
 
     start_url = sys.argv[1]
     out_path = sys.argv[2]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
 
-    crawler = LeadershipCrawler(start_url, max_pages=200, max_depth=3, verbose=True)
+    crawler = LeadershipCrawler(start_url, max_pages=200, max_depth=3, verbose=True, workers=workers)
     results = crawler.crawl()
     print(f"Found {len(results)} bios")
 
@@ -0,0 +1,83 @@
+import threading
+import time
+from multiprocessing import Value
+
+
+class StageStats:
+    """
+    Process-shared counters for one pipeline stage. Create in the parent and
+    hand to workers at process start (Process args / pool initargs).
+
+    busy:    seconds spent working on items
+    idle:    seconds spent waiting for input
+    blocked: seconds spent waiting to hand output downstream (back-pressure)
+    """
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.items = Value('i', 0)
+        self.errors = Value('i', 0)
+        self.busy = Value('d', 0.0)
+        self.idle = Value('d', 0.0)
+        self.blocked = Value('d', 0.0)
+
+    def add(self, items=0, errors=0, busy=0.0, idle=0.0, blocked=0.0):
+        for counter, amount in ((self.items, items), (self.errors, errors), (self.busy, busy),
+                                (self.idle, idle), (self.blocked, blocked)):
+            if amount:
+                with counter.get_lock():
+                    counter.value += amount
+
+    def snapshot(self):
+        return {
+            "items": self.items.value,
+            "errors": self.errors.value,
+            "busy": self.busy.value,
+            "idle": self.idle.value,
+            "blocked": self.blocked.value,
+        }
+
+    def summary(self, elapsed):
+        s = self.snapshot()
+        capacity = max(elapsed * self.workers, 1e-9)
+        return (f"{self.name}: {s['items']} done ({s['items'] / max(elapsed, 1e-9):.2f}/s), "
+                f"{s['errors']} errors, busy {100 * s['busy'] / capacity:.0f}%, "
+                f"idle {100 * s['idle'] / capacity:.0f}%, "
+                f"blocked {100 * s['blocked'] / capacity:.0f}%")
+
+
+class StatsMonitor:
+    """Background thread that periodically prints queue depth and stage stats."""
+
+    def __init__(self, queue, stages, interval=60, maxsize=None):
+        self.queue = queue
+        self.stages = stages
+        self.interval = interval
+        self.maxsize = maxsize
+        self.started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        try:
+            depth = self.queue.qsize()
+        except NotImplementedError:  # macOS
+            depth = "?"
+        cap = f"/{self.maxsize}" if self.maxsize else ""
+        parts = [f"queue={depth}{cap}"] + [s.summary(elapsed) for s in self.stages]
+        print("[stats] " + " | ".join(parts))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.report()
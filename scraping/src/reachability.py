@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TIMEOUT = (2, 4)  # connect/read timeout
+POOL_SIZE = 32
+HOST_TTL = float(os.environ.get("HOST_REACHABILITY_TTL", 6 * 3600))  # seconds
+
+# reachable: the host answered with a 2xx/3xx status
+# connected: the host answered at all (any HTTP status)
+HostStatus = namedtuple("HostStatus", ["reachable", "connected", "reason"])
+
+_local = threading.local()
+_cache = {}  # host -> (HostStatus, checked_at)
+_cache_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Per-thread pooled session, so connections are reused across requests."""
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        _local.session = s
+    return s
+
+
+def host_key(url: str) -> str:
+    if not urlparse(url).scheme:
+        url = "https://" + url
+    return urlparse(url).netloc.lower().replace("www.", "")
+
+
+def check_host(url: str) -> HostStatus:
+    """
+    Probe the host behind url once (HEAD -> tiny GET fallback, https -> http
+    on SSL errors) and cache the result for HOST_TTL seconds.
+    """
+    if not urlparse(url).scheme:
+        url = "https://" + url
+    key = host_key(url)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit and time.monotonic() - hit[1] < HOST_TTL:
+            return hit[0]
+
+    status = _probe(url)
+    with _cache_lock:
+        _cache[key] = (status, time.monotonic())
+    return status
+
+
+def _probe_once(s, url, prefix=""):
+    r = s.head(url, timeout=TIMEOUT, allow_redirects=True)
+    code, method = r.status_code, "HEAD"
+    if code in (405, 400) or ("HEAD" not in r.headers.get("Allow", "") and code >= 400):
+        # some sites block HEAD → do a tiny GET
+        g = s.get(url, headers={"Range": "bytes=0-0"}, timeout=TIMEOUT, allow_redirects=True, stream=True)
+        g.close()
+        code, method = g.status_code, "GET"
+    if 200 <= code < 400:
+        return HostStatus(True, True, "")
+    return HostStatus(False, True, f"{prefix}{method} {code}")
+
+
+def _probe(url: str) -> HostStatus:
+    s = get_session()
+    try:
+        return _probe_once(s, url)
+    except requests.exceptions.SSLError:
+        # retry with plain http on SSL/handshake problems
+        try:
+            return _probe_once(s, "http://" + url.split("://", 1)[-1], prefix="HTTP ")
+        except Exception as e2:
+            return HostStatus(False, False, f"http-retry-failed: {type(e2).__name__}")
+    except (requests.exceptions.ConnectTimeout,
+            requests.exceptions.ReadTimeout,
+            requests.exceptions.ConnectionError) as e:
+        return HostStatus(False, False, type(e).__name__)
+    except requests.exceptions.RequestException as e:
+        return HostStatus(False, False, f"req-exc:{type(e).__name__}")
@@ -1,17 +1,17 @@
 import os
-import time
-from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
-import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from sentence_transformers import SentenceTransformer
+from multiprocessing.util import Finalize
+from urllib.parse import urlparse
 import numpy as np
 import re
-import csv
+import json
+from crawler import Frontier, crawl_site_async, filter_links, path_priority
+from document import SiteDocument
+from extract import extract_page
+from unreachable import get_registry
+from reachability import check_host
+from driver_pool import get_pool
+from embedding_cache import EmbeddingCache
+import embedder
 
 # Keywords to skip crawling (unchanged)
 EXCLUDE_KEYWORDS = {
@@ -26,277 +26,423 @@ EXCLUDE_KEYWORDS = {
     "branch", ".xlsx", "email", "article", "report", ".mp4", ".mp3"
 }
 
-# Ensure output directory exists
+# Crawled text stays in memory; set CRAWL_SPILL=1 to also write a gzipped
+# copy of each site to OUTPUT_DIR for debugging.
 OUTPUT_DIR = "scraped_pages"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+CRAWL_SPILL = os.environ.get("CRAWL_SPILL", "0") == "1"
 
 UNREACHABLE_CSV = os.path.join('', "unreachable.csv")
 
-# Initialize embedding model
-# model = SentenceTransformer('Qwen/Qwen3-Embedding-0.6B')
+# "async" fetches static HTML concurrently and only renders JS-heavy pages in
+# Chrome; "selenium" loads every page through the browser.
+CRAWL_ENGINE = os.environ.get("CRAWL_ENGINE", "async")
 
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+# The embedding model itself is loaded lazily by embedder on first encode
 
-def crawl_site(start_url, max_pages=1000):
+# Persistent chunk-embedding cache; set EMBED_CACHE=0 to disable.
+EMBED_CACHE = os.environ.get("EMBED_CACHE", "1") != "0"
+_embedding_cache = None
+
+def crawl_site(start_url, max_pages=1000, engine=None, prioritize=True):
     """
     Crawl internal pages up to max_pages, extract all headings and paragraphs
-    in the order they appear (writing header text only),
-    and dump them to a single .txt file with page breaks.
+    in the order they appear, and return them as a SiteDocument
+    (pages -> blocks -> chunks).
     """
-    visited, to_visit = set(), [start_url]
     base_domain = urlparse(start_url).netloc.replace("www.", "")
-    firm_name = base_domain.replace('.', '_')
-    output_file = os.path.join(OUTPUT_DIR, f"{firm_name}.txt")
-
-    opts = Options()
-    opts.add_argument("--headless")
-    opts.add_argument("--disable-gpu")
-    opts.add_experimental_option("prefs", {
-        "profile.managed_default_content_settings.images": 2,
-        "profile.managed_default_content_settings.stylesheets": 2,
-        "profile.managed_default_content_settings.fonts": 2,
-    })
-    driver = webdriver.Chrome(options=opts)
+    document = SiteDocument(start_url)
+    unreachable = get_registry(UNREACHABLE_CSV)
+
+    # One probe per host (cached); individual pages fail on the real fetch.
+    if start_url in unreachable:
+        print(f"[skip] Already in unreachable.csv: {start_url}")
+        return document
+    host = check_host(start_url)
+    if not host.connected:
+        print(f"[skip] Unreachable: {start_url} ({host.reason})")
+        unreachable.add(start_url, host.reason)
+        unreachable.flush()
+        return document
+
+    pool = get_pool()
+
+    if (engine or CRAWL_ENGINE) == "async":
+        try:
+            crawl_site_async(
+                start_url, document, max_pages=max_pages,
+                exclude_keywords=EXCLUDE_KEYWORDS,
+                render=pool.render,
+                skip=unreachable,
+                on_failure=unreachable.add,
+                prioritize=prioritize,
+            )
+        finally:
+            unreachable.flush()
+        return _spill(document, base_domain)
+
+    visited = set()
+    to_visit = Frontier(score=path_priority if prioritize else None)
+    to_visit.push(start_url)
 
     while to_visit and len(visited) < max_pages:
-        url = to_visit.pop(0)
+        url = to_visit.pop()
         if url in visited:
             continue
         visited.add(url)
 
-        # ---- Inline reachability preflight (only change) ----
-        test_url = url
+        if url in unreachable:
+            print(f"[skip] Already in unreachable.csv: {url}")
+            continue
+
+        print("Visiting:", url)
+        try:
+            html = pool.render(url)
+        except Exception as e:
+            print(f"[skip] Unreachable: {url} ({type(e).__name__})")
+            unreachable.add(url, type(e).__name__)
+            continue
+        page = extract_page(html)
+        document.add_page(url, page.blocks, page.chunks)
+
+        for candidate in filter_links(page.links, url, base_domain, EXCLUDE_KEYWORDS):
+            if candidate not in visited:
+                to_visit.push(candidate)
 
-        unreachable_set = set()
-        if os.path.exists(UNREACHABLE_CSV):
-            with open(UNREACHABLE_CSV, "r", encoding="utf-8", newline="") as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    if not row:
-                        continue
-                    val = row[0].strip()
-                    if val.lower() != "url" and val:
-                        unreachable_set.add(val)
+    unreachable.flush()
+    return _spill(document, base_domain)
 
 
-        if test_url in unreachable_set:
-            print(f"[skip] Already in unreachable.csv: {test_url}")
-            continue
+def _spill(document, base_domain):
+    if CRAWL_SPILL:
+        path = document.spill(os.path.join(OUTPUT_DIR, f"{base_domain.replace('.', '_')}.txt.gz"))
+        print(f"[crawl] Spilled {len(document)} pages to {path}")
+    return document
+
+
+def snippet_lines(scored_chunks):
+    """
+    Ranked chunks as the list of lines a model prompt receives (the same
+    lines a blank-line separated snippet file would read back as).
+    """
+    return "".join(f"{chunk}\n\n" for chunk, score in scored_chunks).splitlines()
+
+
+def dedupe_chunks(chunks):
+    """Drop exact duplicate chunks, preserving first-seen order."""
+    seen = set()
+    clean_chunks = []
+    for chunk in chunks:
+        if chunk not in seen:
+            seen.add(chunk)
+            clean_chunks.append(chunk)
+    return clean_chunks
+
+
+def _is_noise(p, min_words, min_chars):
+    if len(p.split()) < min_words or len(p) < min_chars:
+        return True
+    letters = [c for c in p if c.isalpha()]
+    if letters and sum(1 for c in letters if c.isupper())/len(letters) > 0.6:
+        return True
+    return False
+
+
+# Per-codepoint character classes (BMP) for text_stats; built on first use.
+_ALPHA, _UPPER, _SPACE = 1, 2, 4
+_char_classes = None
+
+
+def _get_char_classes():
+    global _char_classes
+    if _char_classes is None:
+        classes = np.zeros(0x10000, dtype=np.uint8)
+        for i in range(0x10000):
+            c = chr(i)
+            if c.isalpha():
+                classes[i] = _ALPHA | (_UPPER if c.isupper() else 0)
+            elif c.isspace():
+                classes[i] = _SPACE
+        _char_classes = classes
+    return _char_classes
+
+
+def text_stats(texts):
+    """
+    Word count, character count, letter count and uppercase-letter count of
+    every text, computed over one codepoint array instead of per character
+    in Python. Counts match str.split(), len(), str.isalpha() and
+    str.isupper() (characters outside the BMP count as non-letters).
+    """
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    classes = _get_char_classes().take(np.minimum(codes, 0xFFFF))
+    is_space = (classes & _SPACE).astype(bool)
+    starts = np.cumsum(lengths) - lengths
+
+    # a word starts at a non-space whose predecessor is a space or a text boundary
+    prev_space = np.ones_like(is_space)
+    prev_space[1:] = is_space[:-1]
+    prev_space[starts[lengths > 0]] = True
+    word_starts = (~is_space & prev_space).view(np.uint8)
+
+    nonempty = lengths > 0
+
+    def per_text(flags):
+        totals = np.zeros(len(texts), dtype=np.int64)
+        if nonempty.any():
+            totals[nonempty] = np.add.reduceat(flags, starts[nonempty], dtype=np.int64)
+        return totals
+
+    letters = per_text(classes & _ALPHA)
+    uppers = per_text((classes & _UPPER) >> 1)
+    return per_text(word_starts), lengths, letters, uppers
+
+
+def noise_mask(texts, min_words, min_chars):
+    """Vectorised _is_noise over a list of texts: True where the text is noise."""
+    if not texts:
+        return np.zeros(0, dtype=bool)
+    words, chars, letters, uppers = text_stats(texts)
+    shouty = uppers / np.maximum(letters, 1) > 0.6
+    return (words < min_words) | (chars < min_chars) | ((letters > 0) & shouty)
+
+
+def drop_noise(paragraphs, min_words, min_chars):
+    """Paragraphs that are not noise, or all of them if every one is."""
+    mask = noise_mask(paragraphs, min_words, min_chars)
+    return [p for p, noisy in zip(paragraphs, mask) if not noisy] or paragraphs
 
 
-        if not urlparse(test_url).scheme:
-            test_url = "https://" + test_url
+def top_indices(scores, k):
+    """Indices of the k highest scores, best first, without sorting everything."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
 
-        reachable = False
+
+def contains_flags(texts, pattern):
+    """1.0 where the pattern (anything with .search) occurs in the text, else 0.0."""
+    search = pattern.search
+    return np.fromiter((search(p) is not None for p in texts), dtype=np.float32, count=len(texts))
+
+
+_query_vectors = {}
+
+
+def query_vectors(queries):
+    """
+    Unit-length vectors for ranking queries, encoded once per process: the
+    same handful of query strings is scored against every firm.
+    """
+    missing = [q for q in dict.fromkeys(queries) if q not in _query_vectors]
+    if missing:
+        vecs = encode_normalized(missing)
+        vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        _query_vectors.update(zip(missing, vecs.astype(np.float32)))
+    return np.stack([_query_vectors[q] for q in queries])
+
+
+def get_embedding_cache():
+    """This process's EmbeddingCache, or None if disabled or unavailable."""
+    global _embedding_cache, EMBED_CACHE
+    if _embedding_cache is None and EMBED_CACHE:
         try:
-            # fast HEAD; any status means reachable
-            r = requests.head(test_url, timeout=(2, 4), allow_redirects=True)
-            if r.status_code in (405, 400) or ("HEAD" not in r.headers.get("Allow", "") and r.status_code >= 400):
-                # some sites block HEAD → do a tiny GET
-                g = requests.get(test_url, headers={"Range": "bytes=0-0"}, timeout=(2, 4), allow_redirects=True, stream=True)
-                g.close()
-            reachable = True
-        except requests.exceptions.SSLError:
-            # try plain http on SSL/handshake problems
-            if test_url.startswith("https://"):
-                http_url = "http://" + test_url[len("https://"):]
-            else:
-                http_url = "http://" + test_url
-            try:
-                r2 = requests.head(http_url, timeout=(2, 4), allow_redirects=True)
-                if r2.status_code in (405, 400) or ("HEAD" not in r2.headers.get("Allow", "") and r2.status_code >= 400):
-                    g2 = requests.get(http_url, headers={"Range": "bytes=0-0"}, timeout=(2, 4), allow_redirects=True, stream=True)
-                    g2.close()
-                reachable = True
-            except Exception as e2:
-                print(f"[skip] Unreachable (SSL->HTTP failed): {url} ({type(e2).__name__})")
-        except (requests.exceptions.ConnectTimeout,
-                requests.exceptions.ReadTimeout,
-                requests.exceptions.ConnectionError,
-                requests.exceptions.TooManyRedirects) as e:
-            # give GET one chance after connection-type issues
-            try:
-                g3 = requests.get(test_url, headers={"Range": "bytes=0-0"}, timeout=(2, 4), allow_redirects=True, stream=True)
-                g3.close()
-                reachable = True
-            except Exception as e3:
-                print(f"[skip] Unreachable: {url} ({type(e).__name__} -> {type(e3).__name__})")
+            _embedding_cache = EmbeddingCache(embedder.cache_namespace(), embedder.embedding_dim())
+            # also runs when a multiprocessing worker exits, unlike atexit
+            Finalize(_embedding_cache, _embedding_cache.flush, exitpriority=10)
         except Exception as e:
-            print(f"[skip] Unreachable (unexpected): {url} ({type(e).__name__})")
+            print(f"[embed-cache] disabled: {e}")
+            EMBED_CACHE = False
+    return _embedding_cache
 
-        if not reachable:
-            new_file = not os.path.exists(UNREACHABLE_CSV)
 
-            with open(UNREACHABLE_CSV, "a", encoding="utf-8", newline="") as f:
-                    w = csv.writer(f)
-                    if new_file:
-                        w.writerow(["url"])
-                    w.writerow([test_url])
-                
-            continue
-        # ---- end inline preflight ----
+def encode_normalized(texts):
+    """
+    Encode a list of texts to unit-length float32 vectors. Cached chunks are
+    served from the embedding cache; only new text goes through the model.
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return embedder.encode(texts)
+    return cache.encode(texts, embedder.encode)
 
-        print("Visiting:", url)
-        driver.get(url.split('#')[0])
 
-        try:
-            WebDriverWait(driver, 3).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-        except:
-            pass
-
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        with open(output_file, "a", encoding="utf-8") as f:
-            for el in soup.find_all(["h1","h2","h3","h4","h5","h6","p"]):
-                text = el.get_text(separator=" ", strip=True)
-                if not text:
-                    continue
-                if el.name.startswith("h"):
-                    f.write(f"\n{text}\n")
-                else:
-                    f.write(text + "\n")
-            f.write("\n---PAGE BREAK---\n\n")
-
-        for tag in soup.find_all("a", href=True):
-            href = urljoin(url, tag["href"])
-            p2 = urlparse(href)
-            root_link = p2._replace(query="", fragment="").geturl()
-            if p2.netloc.replace("www.", "") != base_domain:
-                continue
-            if any(kw in root_link.lower() for kw in EXCLUDE_KEYWORDS):
-                continue
-            candidate = root_link + (f"#{p2.fragment}" if p2.fragment else "")
-            if candidate not in visited and candidate not in to_visit:
-                to_visit.append(candidate)
-
-    driver.quit()
-    return output_file
-
-
-def chunk_text(lines):
+class FirmEmbeddings:
     """
-    Split text into chunks by single blank-line separators, but ensure that headers
-    stay with their following paragraphs. Page-break markers also split.
-    Returns a list of chunk strings.
+    A firm's deduplicated chunks and their unit-normalised embeddings,
+    computed once and shared by every ranking query for that firm.
     """
-    chunks, current = [], []
-    for line in lines:
-        stripped = line.strip()
-        if stripped == "---PAGE BREAK---":
-            if current:
-                chunks.append("\n".join(current).strip())
-                current = []
-            continue
-        if stripped == "":
-            if current and len(current) > 1:
-                chunks.append("\n".join(current).strip())
-                current = []
-            continue
-        current.append(line)
-    if current:
-        chunks.append("\n".join(current).strip())
-    return chunks
+
+    def __init__(self, chunks, vectors):
+        self.chunks = list(chunks)
+        self.vectors = vectors
+        self.index = {c: i for i, c in enumerate(self.chunks)}
+
+    @classmethod
+    def encode(cls, chunks):
+        return cls(chunks, encode_normalized(list(chunks)))
+
+    def vectors_for(self, paragraphs):
+        """Rows for `paragraphs`; any chunk not seen at build time is encoded now."""
+        missing = [p for p in paragraphs if p not in self.index]
+        if missing:
+            missing = dedupe_chunks(missing)
+            self.vectors = np.vstack([self.vectors, encode_normalized(missing)]) if self.chunks else encode_normalized(missing)
+            for p in missing:
+                self.index[p] = len(self.chunks)
+                self.chunks.append(p)
+        return self.vectors[[self.index[p] for p in paragraphs]]
+
+    def save(self, prefix):
+        """Write vectors to <prefix>.npy and chunks to <prefix>.json."""
+        np.save(prefix + ".npy", self.vectors)
+        with open(prefix + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.chunks, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, prefix):
+        with open(prefix + ".json", "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        return cls(chunks, np.load(prefix + ".npy"))
+
+    @staticmethod
+    def delete(prefix):
+        for ext in (".npy", ".json"):
+            if os.path.exists(prefix + ext):
+                os.remove(prefix + ext)
 
 
 def embed_and_rank_paragraphs_thesis(paragraphs, query, industry, top_k=5,
-                                    min_words=3, min_chars=30, boost_weight=0.2):
+                                    min_words=3, min_chars=30, boost_weight=0.2,
+                                    embeddings=None):
     """
     Rank text chunks by semantic similarity to a thesis-focused query,
     with an optional industry keyword boost. Returns up to top_k (chunk, score).
+    Pass a FirmEmbeddings to reuse precomputed chunk vectors.
     """
-    import re
-
-    # Simple noise filter (reuse logic)
-    def is_noise(p):
-        if len(p.split()) < min_words or len(p) < min_chars:
-            return True
-        letters = [c for c in p if c.isalpha()]
-        if letters and sum(c.isupper() for c in letters) / len(letters) > 0.6:
-            return True
-        return False
-
-    clean = [p for p in paragraphs if not is_noise(p)] or paragraphs
+    clean = drop_noise(paragraphs, min_words, min_chars)
 
     # Compute embeddings and cosine similarities
-    qv   = model.encode(query, convert_to_numpy=True)
-    embs = model.encode(clean, batch_size=64, convert_to_numpy=True)
-    sims = np.dot(embs, qv) / (np.linalg.norm(embs, axis=1) * np.linalg.norm(qv))
+    qv = query_vectors([query])[0]
+    embs = embeddings.vectors_for(clean) if embeddings is not None else encode_normalized(clean)
+    sims = embs @ qv
 
     # Industry keyword boost
-    ind_flags = np.array([
-        1 if industry.lower() in p.lower() else 0
-        for p in clean
-    ])
+    ind_flags = contains_flags(clean, re.compile(re.escape(industry), re.IGNORECASE))
 
     # Combine scores
     scores = sims + boost_weight * ind_flags
 
     # Select top_k
-    idxs = np.argsort(scores)[::-1][:top_k]
+    idxs = top_indices(scores, top_k)
     return [(clean[i], float(scores[i])) for i in idxs]
 
 
+def rank_theses(embeddings, industries, top_k=30,
+                min_words=3, min_chars=30, boost_weight=0.2):
+    """
+    Batched embed_and_rank_paragraphs_thesis over every industry of a firm:
+    all thesis queries are encoded together and scored with one matrix
+    multiply against the firm's chunk vectors. Returns {industry: [(chunk, score)]}.
+    """
+    if not industries:
+        return {}
+    paragraphs = embeddings.chunks
+    clean = drop_noise(paragraphs, min_words, min_chars)
+    if not clean:
+        return {ind: [] for ind in industries}
+
+    queries = query_vectors([f"What is the investment thesis for {ind}?" for ind in industries])
+    sims = embeddings.vectors_for(clean) @ queries.T  # (chunks, industries)
+
+    lowered = [p.lower() for p in clean]
+    ranked = {}
+    for j, ind in enumerate(industries):
+        ind_lower = ind.lower()
+        ind_flags = np.fromiter((ind_lower in p for p in lowered), dtype=np.float32, count=len(lowered))
+        scores = sims[:, j] + boost_weight * ind_flags
+        idxs = top_indices(scores, top_k)
+        ranked[ind] = [(clean[i], float(scores[i])) for i in idxs]
+    return ranked
+
+
+def union_top_chunks(ranked, per_industry=10, limit=40):
+    """
+    Shared context for a batched thesis prompt: each industry's best
+    `per_industry` chunks from rank_theses, deduplicated and ordered by
+    their best score across industries.
+    """
+    best = {}
+    for scored in ranked.values():
+        for chunk, score in scored[:per_industry]:
+            best[chunk] = max(score, best.get(chunk, score))
+    return sorted(best, key=best.get, reverse=True)[:limit]
+
+
+# Expanded set of PE-industry keywords boosted by embed_and_rank_paragraphs.
+KEYWORDS = {
+    "focus", "invest", "investment", "strategy", "portfolio", "sector", "thesis",
+    "acquire", "acquires", "grows", "grow", "business", "company",
+    "holding", "model", "mission", "goal",
+    "healthcare", "medtech", "medical devices", "pharmaceuticals", "biotech",
+    "technology", "software", "cloud computing", "SaaS", "AI", "machine learning",
+    "cybersecurity", "blockchain", "fintech", "insurtech",
+    "energy", "renewable energy", "oil & gas", "utilities",
+    "industrial", "manufacturing", "automotive", "automotive components",
+    "transportation", "logistics", "supply chain",
+    "consumer", "consumer goods", "FMCG", "ecommerce", "retail",
+    "food & beverage", "hospitality", "travel", "tourism",
+    "education", "edtech",
+    "media", "digital media", "streaming", "gaming",
+    "telecommunications", "5G", "IoT", "internet of things",
+    "real estate", "infrastructure", "construction",
+    "financial services", "banking", "insurance", "wealth management",
+    "mining", "metals", "chemicals",
+    "advertising", "adtech", "martech",
+    "HR tech", "human resources",
+    "data centers", "cloud infrastructure", "hvac", "construction"
+}
+
+
+class KeywordMatcher:
+    """
+    A keyword set compiled to two alternations. Lowercase keywords match as
+    case-insensitive substrings (searched in the lowercased text); acronyms
+    and other mixed-case keywords ("AI", "SaaS") match case-sensitively as
+    whole words, so "AI" does not fire inside "maintain".
+    """
+
+    def __init__(self, keywords):
+        def alternation(words):
+            return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+        lower = [k for k in keywords if k == k.lower()]
+        cased = [k for k in keywords if k != k.lower()]
+        self.lower = re.compile(alternation(lower)) if lower else None
+        self.cased = re.compile(rf"\b(?:{alternation(cased)})\b") if cased else None
+
+    def search(self, text):
+        return ((self.lower and self.lower.search(text.lower()))
+                or (self.cased and self.cased.search(text)))
+
+
+KEYWORD_PATTERN = KeywordMatcher(KEYWORDS)
+
+
 def embed_and_rank_paragraphs(paragraphs, query, top_k=10,
-                              min_words=5, min_chars=60, boost_weight=0.2):
+                              min_words=5, min_chars=60, boost_weight=0.2,
+                              embeddings=None):
     """
     Embed+rank text blocks by similarity, boosting those containing
     an expanded set of PE-industry keywords. Returns list of (chunk, score).
+    Pass a FirmEmbeddings to reuse precomputed chunk vectors.
     """
-    KEYWORDS = {
-        "focus", "invest", "investment", "strategy", "portfolio", "sector", "thesis",
-        "acquire", "acquires", "grows", "grow", "business", "company",
-        "holding", "model", "mission", "goal",
-        "healthcare", "medtech", "medical devices", "pharmaceuticals", "biotech",
-        "technology", "software", "cloud computing", "SaaS", "AI", "machine learning",
-        "cybersecurity", "blockchain", "fintech", "insurtech",
-        "energy", "renewable energy", "oil & gas", "utilities",
-        "industrial", "manufacturing", "automotive", "automotive components",
-        "transportation", "logistics", "supply chain",
-        "consumer", "consumer goods", "FMCG", "ecommerce", "retail",
-        "food & beverage", "hospitality", "travel", "tourism",
-        "education", "edtech",
-        "media", "digital media", "streaming", "gaming",
-        "telecommunications", "5G", "IoT", "internet of things",
-        "real estate", "infrastructure", "construction",
-        "financial services", "banking", "insurance", "wealth management",
-        "mining", "metals", "chemicals",
-        "advertising", "adtech", "martech",
-        "HR tech", "human resources",
-        "data centers", "cloud infrastructure", "hvac", "construction"
-    }
-
-    def is_noise(p):
-        if len(p.split()) < min_words or len(p) < min_chars:
-            return True
-        letters = [c for c in p if c.isalpha()]
-        if letters and sum(1 for c in letters if c.isupper())/len(letters) > 0.6:
-            return True
-        return False
-
-    clean = [p for p in paragraphs if not is_noise(p)] or paragraphs
-    qv = model.encode(query, convert_to_numpy=True)
-    embs = model.encode(clean, convert_to_numpy=True, batch_size=64)
-    sims = np.dot(embs, qv) / (np.linalg.norm(embs, axis=1) * np.linalg.norm(qv))
-    flags = np.array([1 if any(kw in p.lower() for kw in KEYWORDS) else 0 for p in clean])
+    clean = drop_noise(paragraphs, min_words, min_chars)
+    qv = query_vectors([query])[0]
+    embs = embeddings.vectors_for(clean) if embeddings is not None else encode_normalized(clean)
+    sims = embs @ qv
+    flags = contains_flags(clean, KEYWORD_PATTERN)
     scores = sims + boost_weight * flags
-    idxs = np.argsort(scores)[::-1][:top_k]
+    idxs = top_indices(scores, top_k)
     return [(clean[i], float(scores[i])) for i in idxs]
 
-
-def read_txt(folder_path, filename):
-    full_path = os.path.join(folder_path, filename)
-    with open(full_path, "r", encoding="utf-8") as f:
-        return f.read().splitlines()
-
-
-def delete_txt(folder_path, filename):
-    file_path = os.path.join(folder_path, filename)
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print(f"Deleted: {file_path}")
-        else:
-            print(f"File not found: {file_path}")
-    except Exception as e:
-        print(f"Error deleting {file_path}: {e}")
@@ -1,15 +1,277 @@
+import io
+import os
+import threading
+import time
+
 import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import execute_values
+
+PG_POOL_MIN = int(os.environ.get("PG_POOL_MIN", 1))
+PG_POOL_MAX = int(os.environ.get("PG_POOL_MAX", 8))
+
+# Rows are written in batches of up to DB_BATCH_SIZE, at most DB_FLUSH_SECONDS
+# after the first row of a batch was queued.
+DB_BATCH_SIZE = int(os.environ.get("DB_BATCH_SIZE", 500))
+DB_FLUSH_SECONDS = float(os.environ.get("DB_FLUSH_SECONDS", 5))
+
+PERSON_UPSERT = """
+    INSERT INTO people (name, firm, region, position, faith, evidence)
+    VALUES %s
+    ON CONFLICT (name, firm) DO UPDATE
+    SET position = EXCLUDED.position,
+        faith = EXCLUDED.faith,
+        evidence = EXCLUDED.evidence;
+"""
+
+FIRM_COLUMNS = ("name", "website", "industry_area", "thesis", "country", "founded", "industry",
+                "linkedin_url", "locality", "region", "size", "firm_id")
+
+# A firm has one row per industry; firms without industries have a NULL one.
+# Rows are keyed on the pefirms.csv id, so different firms sharing a name stay
+# apart; rows written before firm_id existed have it NULL.
+FIRM_KEY_SQL = "firm_id, (COALESCE(industry_area, ''))"
+
+
+def firm_key(firm):
+    """Writer key of a queued firm (a tuple of its FIRM_COLUMNS rows)."""
+    row = firm[0]
+    return row[-1] if row[-1] is not None else ("name", row[0])
+
+
+def _copy_field(value):
+    """One field in COPY's text format: \\N for NULL, backslash escapes otherwise."""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def merge_firms(cur, firms):
+    """
+    Bulk replace of whole firms, each given as a tuple of FIRM_COLUMNS rows:
+    COPY into a session-local staging table, delete the rows each firm no
+    longer has (its other industries) and the legacy rows without firm_id
+    that it replaces (same name and industry_area), then one INSERT ... ON
+    CONFLICT on the (firm_id, industry_area) key, where the last row staged
+    for a key wins. A firm's rows are always in the same batch, so nothing
+    it just wrote is deleted.
+    """
+    cols = ", ".join(FIRM_COLUMNS)
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS firms_staging (
+            seq INTEGER, {", ".join(c + " TEXT" for c in FIRM_COLUMNS)})
+        ON COMMIT DELETE ROWS;
+    """)
+    # seq is the order rows were queued in
+    rows = [(seq,) + row for seq, row in enumerate(row for firm in firms for row in firm)]
+    buf = io.StringIO("".join("\t".join(map(_copy_field, row)) + "\n" for row in rows))
+    cur.copy_expert(f"COPY firms_staging (seq, {cols}) FROM STDIN", buf)
+    cur.execute("""
+        DELETE FROM firms f
+        USING firms_staging s
+        WHERE (f.firm_id = s.firm_id
+               AND NOT EXISTS (
+                   SELECT 1 FROM firms_staging n
+                   WHERE n.firm_id = f.firm_id
+                     AND COALESCE(n.industry_area, '') = COALESCE(f.industry_area, '')))
+           OR (f.firm_id IS NULL AND f.name = s.name
+               AND COALESCE(f.industry_area, '') = COALESCE(s.industry_area, ''));
+    """)
+    cur.execute(f"""
+        INSERT INTO firms ({cols})
+        SELECT DISTINCT ON (COALESCE(firm_id, name), COALESCE(industry_area, '')) {cols} FROM firms_staging
+        ORDER BY COALESCE(firm_id, name), COALESCE(industry_area, ''), seq DESC
+        ON CONFLICT ({FIRM_KEY_SQL}) DO UPDATE
+        SET name = EXCLUDED.name,
+            website = EXCLUDED.website,
+            thesis = EXCLUDED.thesis,
+            country = EXCLUDED.country,
+            founded = EXCLUDED.founded,
+            industry = EXCLUDED.industry,
+            linkedin_url = EXCLUDED.linkedin_url,
+            locality = EXCLUDED.locality,
+            region = EXCLUDED.region,
+            size = EXCLUDED.size;
+    """)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_db_pool(host, port, database, user, password):
+    """Process-wide connection pool per database; a forked child opens its own."""
+    key = (os.getpid(), host, str(port), database, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = pg_pool.ThreadedConnectionPool(
+                PG_POOL_MIN, PG_POOL_MAX,
+                host=host, port=port, database=database, user=user, password=password)
+        return pool
+
+
+def close_db_pool(host, port, database, user, password):
+    """Close this process's pool for the database, e.g. before forking workers."""
+    key = (os.getpid(), host, str(port), database, user)
+    with _pools_lock:
+        pool = _pools.pop(key, None)
+    if pool is not None:
+        pool.closeall()
+
+
+class BatchWriter:
+    """
+    Buffers rows for one `INSERT ... VALUES %s` statement (written with
+    execute_values) or for a `write(cursor, rows)` function such as
+    merge_firms: one round trip and one commit per batch instead of per row. A batch is flushed once `batch_size` rows are queued,
+    `flush_seconds` after its first row (from a background thread), and on
+    flush()/close().
+
+    When a batch fails, it is split in halves and retried, so a bad row is
+    rejected (and passed to `on_error`) without losing the rest; `on_flush`
+    gets the rows that were committed. With `key`,
+    rows sharing a key within one batch collapse to the last one, which
+    ON CONFLICT DO UPDATE requires. Connection errors, including failing
+    to get a connection from the pool, leave the batch queued and are
+    raised to the caller.
+    """
+
+    def __init__(self, pool, sql, name="rows", key=None, on_error=None, on_flush=None,
+                 batch_size=DB_BATCH_SIZE, flush_seconds=DB_FLUSH_SECONDS):
+        self.pool = pool
+        self.sql = sql
+        self.name = name
+        self.key = key
+        self.on_error = on_error
+        self.on_flush = on_flush
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.rows = []
+        self.first_queued = None
+        self.written = self.rejected = 0
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if flush_seconds:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def add(self, row):
+        with self.lock:
+            if not self.rows:
+                self.first_queued = time.monotonic()
+            self.rows.append(tuple(row))
+            if len(self.rows) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            return self._flush_locked()
+
+    def _run(self):
+        while not self._stop.wait(min(self.flush_seconds, 1.0)):
+            with self.lock:
+                if self.rows and time.monotonic() - self.first_queued >= self.flush_seconds:
+                    try:
+                        self._flush_locked()
+                    except (psycopg2.OperationalError, psycopg2.InterfaceError, pg_pool.PoolError) as e:
+                        print(f"[db] {self.name}: flush failed, will retry ({e})")
+                    except Exception as e:
+                        # keep the thread alive for the next batches
+                        print(f"[db] {self.name}: flush failed ({type(e).__name__}: {e})")
+
+    def _flush_locked(self):
+        rows, self.rows = self.rows, []
+        if not rows:
+            return 0
+        if self.key:
+            rows = list({self.key(row): row for row in rows}.values())
+        try:
+            conn = self.pool.getconn()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError, pg_pool.PoolError):
+            # database down or pool exhausted: keep the batch for the next flush
+            self.rows = rows + self.rows
+            raise
+        try:
+            written = self._write(conn, rows)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.rows = rows + self.rows
+            self.pool.putconn(conn, close=True)
+            raise
+        except Exception:
+            # not a database error: the batch itself is bad; drop it
+            conn.rollback()
+            self.pool.putconn(conn)
+            print(f"[db] {self.name}: dropped a batch of {len(rows)} rows")
+            raise
+        self.pool.putconn(conn)
+        self.written += len(written)
+        print(f"[db] {self.name}: wrote {len(written)}/{len(rows)} rows")
+        if self.on_flush and written:
+            self.on_flush(written)
+        return len(written)
+
+    def _write(self, conn, rows):
+        """Write rows, bisecting around failures; returns the rows committed."""
+        try:
+            with conn.cursor() as cur:
+                if callable(self.sql):
+                    self.sql(cur, rows)
+                else:
+                    execute_values(cur, self.sql, rows, page_size=len(rows))
+            conn.commit()
+            return rows
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            raise
+        except psycopg2.Error as e:
+            conn.rollback()
+            if len(rows) == 1:
+                self.rejected += 1
+                if self.on_error:
+                    self.on_error(rows[0], e)
+                else:
+                    print(f"[db] {self.name}: rejected {rows[0][:2]}: {e}")
+                return []
+            mid = len(rows) // 2
+            return self._write(conn, rows[:mid]) + self._write(conn, rows[mid:])
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
 
 class SQLConnection:
+    """
+    A pooled connection plus batched writers. Rows passed to save_*_to_db
+    are queued and written in batches; flush() forces them out and close()
+    flushes before returning the connection to the pool.
+    """
+
     def __init__(self, host, port, database, user, password):
-        self.conn = psycopg2.connect(
-            host=host,
-            port=port,
-            database=database,
-            user=user,
-            password=password
-        )
+        self.pool = get_db_pool(host, port, database, user, password)
+        self.conn = self.pool.getconn()
         self.cursor = self.conn.cursor()
+        self.writers = {}
+        self.writers_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def writer(self, name, sql, key=None, on_flush=None):
+        with self.writers_lock:
+            if name not in self.writers:
+                self.writers[name] = BatchWriter(self.pool, sql, name=name, key=key, on_flush=on_flush)
+            return self.writers[name]
+
+    def flush(self):
+        return sum(w.flush() for w in self.writers.values())
 
     def create_table(self):
         self.cursor.execute("""
@@ -25,9 +287,64 @@ class SQLConnection:
             linkedin_url TEXT,
             locality TEXT,
             region TEXT,
-            size TEXT
+            size TEXT,
+            firm_id TEXT
         );
         """)
+        # tables created before firm_id existed
+        self.cursor.execute("ALTER TABLE firms ADD COLUMN IF NOT EXISTS firm_id TEXT;")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS firms_firm_id_idx ON firms (firm_id);")
+        self.conn.commit()
+        self.migrate_firms_key()
+        self.create_progress_table()
+
+    def migrate_firms_key(self):
+        """
+        One-off migration to the (firm_id, industry_area) unique key: drops
+        the old (name, industry_area) key, runs dedupe_firms, then builds the
+        index that upserts conflict on. A no-op once the index exists.
+        """
+        self.cursor.execute("SELECT to_regclass('firms_firm_industry_key');")
+        if self.cursor.fetchone()[0] is not None:
+            self.conn.commit()
+            return
+        self.cursor.execute("DROP INDEX IF EXISTS firms_name_industry_key;")
+        removed = self.dedupe_firms(commit=False)
+        self.cursor.execute(f"CREATE UNIQUE INDEX firms_firm_industry_key ON firms ({FIRM_KEY_SQL});")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS firms_name_idx ON firms (name);")
+        self.conn.commit()
+        print(f"[db] firms: removed {removed} duplicate rows, added unique key (firm_id, industry_area)")
+
+    def dedupe_firms(self, commit=True):
+        """
+        Delete all but the newest row for each (firm_id, industry_area), and
+        for each (name, industry_area) among rows without a firm_id; returns
+        rows removed.
+        """
+        self.cursor.execute("""
+            DELETE FROM firms a
+            USING firms b
+            WHERE COALESCE(a.industry_area, '') = COALESCE(b.industry_area, '')
+              AND (a.firm_id = b.firm_id
+                   OR (a.firm_id IS NULL AND b.firm_id IS NULL AND a.name = b.name))
+              AND a.id < b.id;
+        """)
+        removed = self.cursor.rowcount
+        if commit:
+            self.conn.commit()
+        return removed
+
+    def create_progress_table(self):
+        """Per-firm pipeline checkpoints, one row per pefirms.csv id (see checkpoint.py)."""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS firm_progress (
+                firm_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                stage TEXT NOT NULL CHECK (stage IN ('crawled', 'ranked', 'llm_done', 'saved')),
+                updated TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS firm_progress_stage_idx ON firm_progress (stage);")
         self.conn.commit()
 
     def create_people_table(self):
@@ -46,36 +363,32 @@ class SQLConnection:
         self.conn.commit()
 
     def save_person_to_db(self, name: str, firm: str, region: str, position: str, faith: int, evidence: str):
-        try:
-            self.cursor.execute("""
-                INSERT INTO people (name, firm, region, position, faith, evidence)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (name, firm) DO UPDATE
-                SET position = EXCLUDED.position,
-                    faith = EXCLUDED.faith,
-                    evidence = EXCLUDED.evidence;
-            """, (name, firm, region, position, faith, evidence))
-            self.conn.commit()
-            print(f"Saved: {name}")
-        except Exception as e:
-            self.conn.rollback()
-            print("Error saving person:", e)
+        self.writer("people", PERSON_UPSERT, key=lambda row: (row[0], row[1])).add(
+            (name, firm, region, position, faith, evidence))
 
-
-    def save_firm_to_db(self, name: str, website: str, industry_area: str, thesis: str,
+    def save_firm_to_db(self, name: str, website: str, theses: dict,
                         country: str, founded: str, industry: str,
-                        linkedin_url: str, locality: str, region: str, size: str):
-        try:
-            self.cursor.execute("""
-                INSERT INTO firms (name, website, industry_area, thesis, country, founded, industry, linkedin_url, locality, region, size)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (id) DO NOTHING;
-            """, (name, website, industry_area, thesis, country, founded, industry, linkedin_url, locality, region, size))
-            self.conn.commit()
-            
-            print(f"Saved: {name}")
-        except Exception as e:
-            print("Error saving firm:", e)
+                        linkedin_url: str, locality: str, region: str, size: str, firm_id: str = None):
+        """
+        Queue a firm's rows, one per {industry_area: thesis} (a single NULL
+        industry row if there are none), replacing what it had before.
+        """
+        firm = tuple((name, website, industry_area, thesis, country, founded, industry, linkedin_url, locality,
+                      region, size, firm_id)
+                     for industry_area, thesis in (theses or {None: None}).items())
+        self.writer("firms", merge_firms, key=firm_key).add(firm)
+
+    def saved_firms(self):
+        """(firm_ids, names of rows without a firm_id) already in the firms table, in one query."""
+        self.cursor.execute("SELECT DISTINCT firm_id, CASE WHEN firm_id IS NULL THEN name END FROM firms;")
+        ids, legacy_names = set(), set()
+        for firm_id, name in self.cursor.fetchall():
+            if firm_id is None:
+                legacy_names.add(name)
+            else:
+                ids.add(firm_id)
+        self.conn.commit()
+        return ids, legacy_names
 
     def select_all(self):
         try:
@@ -97,5 +410,9 @@ class SQLConnection:
 
 
     def close(self):
-        self.cursor.close()
-        self.conn.close()
\ No newline at end of file
+        try:
+            for w in self.writers.values():
+                w.close()
+        finally:
+            self.cursor.close()
+            self.pool.putconn(self.conn)
\ No newline at end of file
@@ -0,0 +1,120 @@
+import atexit
+import csv
+import os
+import threading
+from datetime import datetime, timezone, timedelta
+
+FIELDNAMES = ["url", "reason", "timestamp"]
+
+# Entries older than this are retried; 0 keeps them forever.
+UNREACHABLE_TTL_DAYS = float(os.environ.get("UNREACHABLE_TTL_DAYS", 30))
+
+# Number of new entries buffered before they are appended to disk.
+FLUSH_EVERY = 25
+
+# Rows written before entries were timestamped (or with an unreadable one)
+# are dated here: with a TTL they have expired and are retried once.
+LEGACY_TIMESTAMP = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _parse_timestamp(value):
+    """Aware UTC datetime of a csv timestamp; naive values are taken as UTC."""
+    try:
+        ts = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return LEGACY_TIMESTAMP
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+class UnreachableRegistry:
+    """
+    In-memory view of an unreachable-URL csv. The file is read once; new
+    entries are kept in a set immediately and appended to disk in batches.
+    Each entry carries a failure reason and a UTC timestamp so it can expire.
+    """
+
+    def __init__(self, path, ttl_days=UNREACHABLE_TTL_DAYS, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.ttl = timedelta(days=ttl_days) if ttl_days else None
+        self.flush_every = flush_every
+        self.entries = {}  # url -> (reason, datetime)
+        self.pending = []
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if not row:
+                    continue
+                url = row[0].strip()
+                if not url or url.lower() == "url":
+                    continue
+                reason = row[1].strip() if len(row) > 1 else ""
+                self.entries[url] = (reason, _parse_timestamp(row[2] if len(row) > 2 else ""))
+
+    def __contains__(self, url):
+        entry = self.entries.get(url)
+        if entry is None:
+            return False
+        if self.ttl and datetime.now(timezone.utc) - entry[1] > self.ttl:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.entries)
+
+    def reason(self, url):
+        entry = self.entries.get(url)
+        return entry[0] if entry else None
+
+    def add(self, url, reason=""):
+        ts = datetime.now(timezone.utc).replace(microsecond=0)
+        with self.lock:
+            self.entries[url] = (reason, ts)
+            self.pending.append([url, reason, ts.isoformat()])
+            if len(self.pending) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        needs_newline = False
+        if exists:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) not in (b"\n", b"\r")
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            if needs_newline:
+                f.write("\n")
+            w = csv.writer(f)
+            if not exists:
+                w.writerow(FIELDNAMES)
+            w.writerows(self.pending)
+        self.pending = []
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(path):
+    """Process-wide registry for `path`; pending entries are flushed at exit."""
+    with _registries_lock:
+        reg = _registries.get(path)
+        if reg is None:
+            reg = _registries[path] = UnreachableRegistry(path)
+        return reg
+
+
+@atexit.register
+def flush_all():
+    for reg in list(_registries.values()):
+        reg.flush()
@@ -0,0 +1,34 @@
+"""BatchWriter keeps a batch queued when it cannot reach the database."""
+import psycopg2
+import pytest
+from psycopg2 import pool as pg_pool
+
+from sql import BatchWriter
+
+
+class DownPool:
+    def __init__(self, error):
+        self.error = error
+
+    def getconn(self):
+        raise self.error
+
+    def putconn(self, conn, close=False):
+        raise AssertionError("no connection was handed out")
+
+
+@pytest.mark.parametrize("error", [psycopg2.OperationalError("server closed the connection"),
+                                   pg_pool.PoolError("connection pool exhausted")])
+def test_getconn_failure_keeps_rows_queued(error):
+    w = BatchWriter(DownPool(error), "INSERT INTO t VALUES %s", flush_seconds=0)
+    w.add((1, "a"))
+    w.add((2, "b"))
+    with pytest.raises(type(error)):
+        w.flush()
+    assert w.rows == [(1, "a"), (2, "b")]
+    # rows queued after the failure go behind the retained batch
+    w.add((3, "c"))
+    with pytest.raises(type(error)):
+        w.flush()
+    assert w.rows == [(1, "a"), (2, "b"), (3, "c")]
+    assert w.written == 0
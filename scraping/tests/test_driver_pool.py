@@ -0,0 +1,46 @@
+"""WebDriverPool gives back its slots when a browser fails to start."""
+import pytest
+
+pytest.importorskip("selenium")
+
+from driver_pool import WebDriverPool
+
+
+class FakeDriver:
+    current_url = "about:blank"
+
+    def quit(self):
+        pass
+
+
+def flaky_factory(fail_on):
+    calls = []
+
+    def factory():
+        calls.append(None)
+        if len(calls) in fail_on:
+            raise RuntimeError("chrome failed to start")
+        return FakeDriver()
+    return factory
+
+
+def test_warm_failure_releases_slots():
+    pool = WebDriverPool(size=3, factory=flaky_factory(fail_on={2}))
+    with pytest.raises(RuntimeError):
+        pool.warm()
+    assert pool.idle.qsize() == 1  # the browser started before the failure is kept
+    # every slot is usable again: the failed one was not lost
+    drivers = [pool.acquire(timeout=0.1) for _ in range(3)]
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.1)
+    for pd in drivers:
+        pool.release(pd)
+
+
+def test_repeated_warm_failures_do_not_shrink_the_pool():
+    pool = WebDriverPool(size=2, factory=flaky_factory(fail_on={1, 2}))
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            pool.warm()
+    pds = [pool.acquire(timeout=0.1), pool.acquire(timeout=0.1)]
+    assert all(isinstance(pd.driver, FakeDriver) for pd in pds)
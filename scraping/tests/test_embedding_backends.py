@@ -0,0 +1,67 @@
+"""Quantized/ONNX embedding backends rank a firm's chunks like torch does."""
+import itertools
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import embedder
+from scrape import KEYWORD_PATTERN, contains_flags, top_indices
+
+TOP_K = 5
+MIN_OVERLAP = 0.8  # bench.py backends --min-overlap default
+QUERY = "Industries: Healthcare, Software, Fintech, Retail, Agriculture, Biotech"
+
+SUBJECTS = ["We invest in", "Our team partners with", "The fund backs", "We acquire", "Our portfolio includes"]
+TARGETS = ["lower middle market healthcare services companies", "vertical SaaS and B2B software businesses",
+           "consumer retail and restaurant brands", "fintech and payments infrastructure",
+           "agriculture, food and agtech processors", "industrial manufacturing and distribution",
+           "biotech and life sciences tools providers", "business services with recurring revenue"]
+TAILS = ["with $5-50 million of EBITDA.", "across North America.", "alongside founders and management.",
+         "where we can support add-on acquisitions.", "with a focus on long-term value creation."]
+FILLER = ["Read our latest news and press releases.", "Contact us at our Dallas office for more information.",
+          "Our people bring decades of operating experience to every partnership.",
+          "We have raised five funds with over $2 billion of committed capital."]
+
+
+def firms():
+    sentences = [" ".join(parts) for parts in itertools.product(SUBJECTS, TARGETS, TAILS)]
+    return [sentences[i::4][:30] + FILLER for i in range(4)]
+
+
+def top_k(model, firms):
+    qv = embedder.encode_with(model, [QUERY])[0]
+    tops = []
+    for chunks in firms:
+        vectors = embedder.encode_with(model, chunks)
+        flags = contains_flags(chunks, KEYWORD_PATTERN)
+        tops.append(set(top_indices(vectors @ qv + 0.2 * flags, TOP_K).tolist()))
+    return tops
+
+
+def load(backend):
+    try:
+        return embedder.load_backend(backend)
+    except (ImportError, OSError, ValueError) as e:
+        # backend extra not installed, or the model can't be downloaded here
+        pytest.skip(f"{backend} unavailable: {type(e).__name__}: {e}")
+
+
+@pytest.fixture(scope="module")
+def sample():
+    return firms()
+
+
+@pytest.fixture(scope="module")
+def torch_tops(sample):
+    return top_k(load("torch"), sample)
+
+
+@pytest.mark.parametrize("backend", ["torch-int8", "onnx", "onnx-int8"])
+def test_top_k_overlaps_torch(backend, sample, torch_tops):
+    if backend.startswith("onnx"):
+        pytest.importorskip("optimum.onnxruntime")
+    tops = top_k(load(backend), sample)
+    overlap = np.array([len(a & b) / TOP_K for a, b in zip(tops, torch_tops)])
+    assert overlap.mean() >= MIN_OVERLAP, f"{backend} top-{TOP_K} overlap {overlap}"
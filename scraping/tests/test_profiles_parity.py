@@ -0,0 +1,80 @@
+"""The single-pass PageIndex profile extractor against the find/get_text one."""
+import random
+
+import pytest
+from bs4 import BeautifulSoup
+
+from people_scrape import LeadershipCrawler, PageIndex
+
+FIRST = ["Alice", "Bob", "Carol", "David", "Evelyn", "Frank", "Grace", "Henry", "Irene", "James"]
+LAST = ["Smith", "Jones", "White", "Brown", "Black", "Green", "Hall", "King", "Lopez", "Nguyen"]
+TITLES = ["Managing Director", "Partner", "Vice President", "Principal", "Chief Financial Officer"]
+
+
+def card(style, name, title, bio):
+    if style == 0:
+        return f'<div class="team-member"><h3>{name}</h3><p class="title">{title}</p><p>{bio}</p></div>'
+    if style == 1:
+        return (f'<div class="col"><div class="inner"><h4>{name}</h4><span class="role">{title}</span>'
+                f'<div class="text"><p>{bio}</p></div></div></div>')
+    if style == 2:
+        return f'<article><header><h2>{name}</h2></header><div><small>{title}</small></div><p>{bio}</p></article>'
+    return (f'<section class="person-card"><div class="hdr"><h3><a href="#">{name}</a></h3>'
+            f'<div class="position">{title}</div></div><div class="bio"><p>{bio}</p></div></section>')
+
+
+def team_page(seed, nest=0):
+    rng = random.Random(seed)
+    style = seed % 4
+    names = rng.sample([f"{f} {l}" for f in FIRST for l in LAST], rng.randint(1, 25))
+    cards = "".join(card(style, n, rng.choice(TITLES),
+                         f"{n} joined the firm in {rng.randint(1995, 2020)} and focuses on software investments.")
+                    for n in names)
+    body = (f'<script>var x = "<h3>Bad Name</h3>";</script><nav><a href="/team">Our Team</a></nav>'
+            f'<h1>Our Team</h1><div class="grid"><div class="row">{cards}</div></div>'
+            f'<footer><h4>Contact Us</h4><p>1 Main St</p></footer>')
+    return "<html><body>" + "<div>" * nest + body + "</div>" * nest + "</body></html>"
+
+
+PAGES = [team_page(seed, nest) for seed in range(16) for nest in (0, 5)]
+
+
+@pytest.fixture(scope="module")
+def crawler():
+    return LeadershipCrawler("https://example.invalid", verbose=False)
+
+
+@pytest.mark.parametrize("html", PAGES)
+def test_same_names_as_tree_extractor(crawler, html):
+    soup = BeautifulSoup(html, "html.parser")
+    tree = {rec["name"] for rec in crawler._extract_profiles_tree(soup, "u")}
+    single = crawler._extract_profiles_single_pass(soup, "u")
+    assert tree
+    assert {rec["name"] for rec in single} == tree
+    # one record per heading, in document order
+    assert len({rec["name"] for rec in single}) == len(single)
+
+
+@pytest.mark.parametrize("html", PAGES[:8])
+def test_page_index_matches_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+    page = PageIndex(soup)
+    for tag in page.tags:
+        if tag.name not in ("script", "style", "template"):
+            assert page.text(tag) == tag.get_text(" ", strip=True)
+    for container in page.containers:
+        expected = next((h for h in (container.find(t) for t in ["h1", "h2", "h3", "h4"]) if h), None)
+        assert page.heading(container) is expected
+    for tag in page.tags[:50]:
+        assert page.tags_after(tag, 4) == tag.find_all_next(limit=4)
+        assert page.next_paragraph(tag) is tag.find_next("p")
+
+
+def test_card_bio_excludes_rest_of_grid(crawler):
+    html = ('<div class="team"><div class="member"><h3>Alice Smith</h3><p>Partner</p>'
+            '<p>Alice Smith joined the firm in 2001 and leads healthcare investments.</p></div>'
+            '<div class="member"><h3>Bob Jones</h3><p>Principal</p>'
+            '<p>Bob Jones joined the firm in 2010 and focuses on software investments.</p></div></div>')
+    records = crawler._extract_profiles_single_pass(BeautifulSoup(html, "html.parser"), "u")
+    assert [rec["name"] for rec in records] == ["Alice Smith", "Bob Jones"]
+    assert "Bob" not in records[0]["bio"]
@@ -0,0 +1,44 @@
+"""Streamed early-stop checks give the same answer token by token."""
+import random
+
+import pytest
+
+from llama import JsonObjectEnd, batch_theses_done
+
+ANSWERS = [
+    '{"Healthcare": "We back clinics {and} labs", "Software": "B2B \\"SaaS\\" only"}\nThanks!',
+    'Here you go:\n```json\n{"a": {"b": "}"}, "c": "\\\\"}\n```',
+    '{"unterminated": "still going',
+    'no json here',
+    '}{"x": 1}',
+    '""',
+]
+
+
+def first_stop(answer, cuts):
+    """Index of the token at which the whole-text check first says done, or None."""
+    tokens = [answer[i:j] for i, j in zip([0] + cuts, cuts + [len(answer)])]
+    for n in range(1, len(tokens) + 1):
+        if batch_theses_done("".join(tokens[:n])):
+            return n
+    return None
+
+
+@pytest.mark.parametrize("answer", ANSWERS)
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_scan_matches_whole_text(answer, seed):
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(answer)), min(len(answer) - 1, rng.randint(1, 12))))
+    tokens = [answer[i:j] for i, j in zip([0] + cuts, cuts + [len(answer)])]
+    scanner = batch_theses_done.scanner()
+    stopped = next((n for n, token in enumerate(tokens, 1) if scanner.feed(token)), None)
+    assert stopped == first_stop(answer, cuts)
+
+
+def test_scanner_is_per_stream():
+    a, b = JsonObjectEnd(), JsonObjectEnd()
+    assert not a.feed('{"x": "')
+    assert not b.feed('{"y": 1')
+    assert b.feed("}")
+    assert not a.feed("}")  # still inside a's string
+    assert a.feed('"}')
@@ -0,0 +1,84 @@
+"""scan_bio / BIO_PATTERN against the per-keyword loops they replaced."""
+import itertools
+import random
+
+import pytest
+
+import main_people as mp
+import people_scrape as ps
+
+ROLE_WORDS = ['partner', 'principal', 'associate', 'manager', 'managing', 'director', 'vp', 'vice', 'president',
+              'analyst', 'founder', 'co-founder', 'chief', 'officer', 'cto', 'ceo', 'cfo', 'coo', 'chair']
+
+SENTENCES = [
+    "{n} is a Managing Director and serves on the board of several portfolio companies.",
+    "Prior to joining, {n} was a Vice President at a bank; before that an AVP.",
+    "{n} previously served as Chief Financial Officer and later as President of a software company.",
+    "{n} is Chief Investment Officer and President of the fund!",
+    "{n} is active in the local church and serves a faith-based nonprofit.",
+    "Outside of work, {n} reads Scripture, coaches little league and spends time with God's creation.",
+    "{n} co-founded the firm and is an Operating Partner.",
+    "{n} is a Sr. Director, formerly an SVP and Head of Capital Markets.",
+    "{n} was an intern, then an analyst, then a senior associate?",
+    "{n} is the Executive Chairman. Her landlord lives on a passageway.",
+    "{n} MD, CEO, COO and CTO of three companies.",
+    "Before that, {n} worked in operations at a logistics startup in Austin, Texas.",
+]
+POSITIONS = ["", "Partner", "principal", "Vice President", "CEO", "Director of Operations", "Board Member",
+             "Chief Investment Officer, Partner", "Operating Advisor"]
+NAMES = ["Alice Smith", "Justin Park", "Our Team", "Maria Lopez", "Home Services", "Wei Chen", "About Us"]
+
+
+def reference_best_position(heading_pos, bio):
+    found = [canon for canon, pat in mp.TITLE_PATTERNS if pat.search(bio)]
+    bio_pos = min(found, key=lambda c: mp.SENIORITY_RANK_HIGH.get(c, 9999)) if found else None
+    heading_pos = (heading_pos or "").strip()
+    if heading_pos and bio_pos:
+        h = mp.SENIORITY_RANK_HIGH.get(heading_pos.lower(), 9999)
+        return bio_pos if mp.SENIORITY_RANK_HIGH.get(bio_pos, 9999) < h else heading_pos
+    return heading_pos or bio_pos or ""
+
+
+def reference_faith(text):
+    if not text:
+        return 0, ""
+    matches = [s.strip() for s in mp.SENTENCE_SPLIT_REGEX.split(text) if mp.FAITH_REGEX.search(s)]
+    return (1, " ".join(matches)) if matches else (0, "")
+
+
+def bios(n=500, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        name = rng.choice(NAMES)
+        yield rng.choice(POSITIONS), " ".join(s.format(n=name) for s in rng.choices(SENTENCES, k=rng.randint(1, 8)))
+
+
+EDGE_BIOS = ["", "x", "CEO", "chief", "İstanbul native, church elder. Partner at X.",
+             "Gospel singer.\nHead of   Growth! vp", "co-founder and cofounder", "MDs and md5 hashes"]
+
+
+@pytest.mark.parametrize("heading_pos,bio", list(bios()) + list(itertools.product(["", "Partner"], EDGE_BIOS)))
+def test_scan_matches_reference(heading_pos, bio):
+    scan = mp.scan_bio(bio)
+    assert mp.choose_best_position(heading_pos, bio, scan) == reference_best_position(heading_pos, bio)
+    assert mp.choose_best_position(heading_pos, bio) == reference_best_position(heading_pos, bio)
+    assert mp.compute_faith_score(bio, scan) == reference_faith(bio)
+
+
+@pytest.mark.parametrize("canon", list(mp.TITLE_SYNONYMS))
+def test_every_title_is_found(canon):
+    bio = f"She is our {canon.title()}, and an Associate."
+    assert mp.scan_bio(bio)[0] == reference_best_position("", bio) != ""
+
+
+@pytest.mark.parametrize("name", NAMES + ["We’re Hiring", "Thomas Weston", "Jo Us", ""])
+def test_excluded_name(name):
+    assert ps._is_excluded_name(name) == any(ex.lower() in name.lower() for ex in ps.EXCLUDE_NAME_PREFIXES)
+
+
+@pytest.mark.parametrize("text", POSITIONS + ["Smith, Jones", "x" * 90, "Co-Founder", "Chairwoman"])
+def test_looks_like_title(text):
+    crawler = ps.LeadershipCrawler("https://example.invalid", verbose=False)
+    expected = bool(text) and len(text) <= 80 and (
+        any(w in text.lower() for w in ROLE_WORDS) or ("," in text and len(text) <= 60))
+    assert crawler._looks_like_title(text) == expected
@@ -0,0 +1,41 @@
+"""Expiry of unreachable-registry entries read from the csv."""
+import os
+from datetime import datetime, timedelta, timezone
+
+from unreachable import UnreachableRegistry
+
+
+def write_csv(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_legacy_rows_expire_regardless_of_mtime(tmp_path):
+    path = write_csv(tmp_path / "unreachable.csv", "url,reason\nhttps://old.example,ConnectTimeout\n")
+    os.utime(path)  # just written: an mtime-dated row would look fresh
+    assert "https://old.example" not in UnreachableRegistry(path, ttl_days=30)
+    assert "https://old.example" in UnreachableRegistry(path, ttl_days=0)
+
+
+def test_new_entries_survive_a_reload(tmp_path):
+    path = str(tmp_path / "unreachable.csv")
+    reg = UnreachableRegistry(path, ttl_days=30)
+    reg.add("https://down.example", "ClientConnectorError")
+    reg.flush()
+    assert "https://down.example" in UnreachableRegistry(path, ttl_days=30)
+
+
+def test_naive_and_aware_timestamps(tmp_path):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    old = now - timedelta(days=60)
+    path = write_csv(tmp_path / "unreachable.csv",
+                     "url,reason,timestamp\n"
+                     f"https://naive.example,x,{now.replace(tzinfo=None).isoformat()}\n"
+                     f"https://aware.example,x,{now.isoformat()}\n"
+                     f"https://stale.example,x,{old.replace(tzinfo=None).isoformat()}\n"
+                     "https://garbled.example,x,not a date\n")
+    reg = UnreachableRegistry(path, ttl_days=30)
+    assert "https://naive.example" in reg
+    assert "https://aware.example" in reg
+    assert "https://stale.example" not in reg
+    assert "https://garbled.example" not in reg